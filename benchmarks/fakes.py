@@ -0,0 +1,347 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   benchmarks/fakes.py
+#       In-process stand-ins for the YouTube Data API, Google
+#       Cloud Storage and the Natural Language API, so routes can
+#       be benchmarked without network access or credentials.
+#       Every fake call sleeps for a configurable latency and
+#       returns payloads whose size is set by FakeConfig
+# ╚═══════════════════════════════════════════════════════════╝
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import hashlib
+import itertools
+import random
+import threading
+import time
+
+class FakeConfig:
+    """Latencies (seconds) and payload sizes used by the fakes"""
+
+    def __init__(self, youtube_latency=0.05, storage_latency=0.02, language_latency=0.03,
+                 jitter=0.2, videos=20, tags_per_video=12, description_chars=1500,
+                 comments_per_video=300, comment_chars=200, seed=0):
+        """
+        Args:
+            youtube_latency: Seconds per YouTube API call
+            storage_latency: Seconds per GCS call
+            language_latency: Seconds per Natural Language call
+            jitter: Random extra latency, as a fraction of the base latency
+            videos: Videos returned by a search
+            tags_per_video: Tags on each video
+            description_chars: Length of each video description
+            comments_per_video: Comment threads available on each video
+            comment_chars: Length of each comment
+            seed: Seed for the generated content
+        """
+        self.youtube_latency = youtube_latency
+        self.storage_latency = storage_latency
+        self.language_latency = language_latency
+        self.jitter = jitter
+        self.videos = videos
+        self.tags_per_video = tags_per_video
+        self.description_chars = description_chars
+        self.comments_per_video = comments_per_video
+        self.comment_chars = comment_chars
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def sleep(self, latency):
+        if latency > 0:
+            time.sleep(latency * (1 + random.random() * self.jitter))
+
+_WORDS = ('privacy data security tracking consent cookies encryption leak breach policy '
+          'gdpr ccpa vpn browser phone apps location ads surveillance law rights').split()
+
+def _text(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:chars]
+
+class FakeRequest:
+    """A prepared API call, runs when executed like googleapiclient's HttpRequest"""
+
+    def __init__(self, method_id, latency, config, respond):
+        self.methodId = method_id
+        self._latency = latency
+        self._config = config
+        self._respond = respond
+
+    def execute(self, http=None, num_retries=0):
+        self._config.sleep(self._latency)
+        return self._respond()
+
+class _FakeCollection:
+    def __init__(self, list_fn):
+        self._list = list_fn
+
+    def list(self, **params):
+        return self._list(**params)
+
+class FakeYouTube:
+    """Resource with search(), videos() and commentThreads() like the YouTube Data API v3 client"""
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = 0
+        self._lock = threading.Lock()
+        rng = random.Random(config.seed)
+        self._videos = {}
+        for i in range(config.videos):
+            video_id = f"vid{i:05d}"
+            self._videos[video_id] = {
+                'id': video_id,
+                'snippet': {
+                    'title': f"Privacy video {i}",
+                    'channelTitle': f"Channel {i % 7}",
+                    'description': _text(rng, config.description_chars),
+                    'tags': [f"{rng.choice(_WORDS)}" if j % 3 else f"tag{rng.randint(0, 200)}"
+                             for j in range(config.tags_per_video)],
+                    'thumbnails': {'medium': {'url': f"https://example.invalid/{video_id}.jpg"}}
+                },
+                'statistics': {
+                    'viewCount': str(rng.randint(1000, 10 ** 7)),
+                    'likeCount': str(rng.randint(10, 10 ** 5)),
+                    'commentCount': str(config.comments_per_video)
+                }
+            }
+
+    def _call(self, method_id, respond):
+        with self._lock:
+            self.calls += 1
+        return FakeRequest(method_id, self.config.youtube_latency, self.config, respond)
+
+    def search(self):
+        def list_fn(maxResults=5, **params):
+            items = [{'id': {'videoId': video_id}} for video_id in itertools.islice(self._videos, maxResults)]
+            return self._call('youtube.search.list', lambda: {'items': items})
+        return _FakeCollection(list_fn)
+
+    def videos(self):
+        def list_fn(id=None, maxResults=None, **params):
+            ids = id.split(',') if id else list(self._videos)[:maxResults or 5]
+            return self._call('youtube.videos.list', lambda: {'items': [self._videos[i] for i in ids if i in self._videos]})
+        return _FakeCollection(list_fn)
+
+    def commentThreads(self):
+        def list_fn(videoId=None, maxResults=20, pageToken=None, **params):
+            start = int(pageToken or 0)
+            stop = min(start + maxResults, self.config.comments_per_video)
+
+            def respond():
+                rng = random.Random(f"{videoId}:{start}")
+                items = [{
+                    'id': f"{videoId}-c{n}",
+                    'snippet': {'topLevelComment': {'snippet': {
+                        'textDisplay': _text(rng, self.config.comment_chars),
+                        'authorDisplayName': f"user{rng.randint(0, 999)}",
+                        'likeCount': rng.randint(0, 50),
+                        'publishedAt': '2026-01-01T00:00:00Z'
+                    }}}
+                } for n in range(start, stop)]
+                response = {'items': items}
+                if stop < self.config.comments_per_video:
+                    response['nextPageToken'] = str(stop)
+                return response
+            return self._call('youtube.commentThreads.list', respond)
+        return _FakeCollection(list_fn)
+
+class FakeBlob:
+    """In-memory object with the parts of google.cloud.storage.Blob DataStorage uses"""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+        self.content_type = None
+        self.content_encoding = None
+        self.generation = None
+        self.size = None
+        self.updated = None
+
+    @property
+    def etag(self):
+        return str(self.generation) if self.generation is not None else None
+
+    def _load(self, entry):
+        data, self.metadata, self.content_type, self.content_encoding, self.generation, self.updated = entry
+        self.metadata = dict(self.metadata) if self.metadata else None
+        self.size = len(data)
+
+    def reload(self):
+        from google.api_core.exceptions import NotFound
+        self.bucket.config.sleep(self.bucket.config.storage_latency)
+        entry = self.bucket.objects.get(self.name)
+        if entry is None:
+            raise NotFound(f"{self.name} not found in {self.bucket.name}")
+        self._load(entry)
+
+    def upload_from_string(self, data, content_type='text/plain', if_generation_match=None):
+        from google.api_core.exceptions import PreconditionFailed
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bucket.config.sleep(self.bucket.config.storage_latency)
+        with self.bucket.lock:
+            current = self.bucket.objects.get(self.name)
+            if if_generation_match is not None and (current[4] if current else 0) != if_generation_match:
+                raise PreconditionFailed(f"Generation precondition failed for {self.name}")
+            entry = (data, self.metadata, content_type, self.content_encoding,
+                     next(self.bucket.generations), datetime.now(timezone.utc))
+            self.bucket.objects[self.name] = entry
+        self._load(entry)
+
+    def download_as_bytes(self, start=None, end=None, raw_download=False, if_generation_match=None):
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+        self.bucket.config.sleep(self.bucket.config.storage_latency)
+        entry = self.bucket.objects.get(self.name)
+        if entry is None:
+            raise NotFound(f"{self.name} not found in {self.bucket.name}")
+        if if_generation_match is not None and entry[4] != if_generation_match:
+            raise PreconditionFailed(f"{self.name} changed while it was being read")
+        return entry[0][start or 0:end + 1 if end is not None else None]
+
+    def delete(self):
+        from google.api_core.exceptions import NotFound
+        self.bucket.config.sleep(self.bucket.config.storage_latency)
+        with self.bucket.lock:
+            if self.bucket.objects.pop(self.name, None) is None:
+                raise NotFound(f"{self.name} not found in {self.bucket.name}")
+
+class FakeBucket:
+    """In-memory bucket, every call costs one storage latency"""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.objects = {}
+        self.lock = threading.Lock()
+        self.generations = itertools.count(1)
+
+    def blob(self, blob_name):
+        return FakeBlob(self, blob_name)
+
+    def get_blob(self, blob_name):
+        self.config.sleep(self.config.storage_latency)
+        entry = self.objects.get(blob_name)
+        if entry is None:
+            return None
+        blob = FakeBlob(self, blob_name)
+        blob._load(entry)
+        return blob
+
+    def list_blobs(self, prefix=None, max_results=None, fields=None):
+        self.config.sleep(self.config.storage_latency)
+        blobs = []
+        for name in sorted(self.objects):
+            if prefix and not name.startswith(prefix):
+                continue
+            blob = FakeBlob(self, name)
+            blob._load(self.objects[name])
+            blobs.append(blob)
+            if max_results and len(blobs) >= max_results:
+                break
+        return blobs
+
+class FakeStorageClient:
+    """Stand-in for google.cloud.storage.Client, buckets are created on first use"""
+
+    def __init__(self, config):
+        self.config = config
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, bucket_name):
+        self.config.sleep(self.config.storage_latency)
+        with self._lock:
+            bucket = self.buckets.get(bucket_name)
+            if bucket is None:
+                bucket = self.buckets[bucket_name] = FakeBucket(bucket_name, self.config)
+        return bucket
+
+    create_bucket = get_bucket
+
+    def list_buckets(self, max_results=None):
+        self.config.sleep(self.config.storage_latency)
+        return list(self.buckets.values())[:max_results]
+
+class FakeLanguageClient:
+    """Stand-in for language_v1.LanguageServiceClient with deterministic scores"""
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def analyze_sentiment(self, request=None, timeout=None, **kwargs):
+        document = request['document'] if isinstance(request, dict) else request.document
+        self.config.sleep(self.config.language_latency)
+        with self._lock:
+            self.calls += 1
+        digest = hashlib.blake2b(document.content.encode('utf-8'), digest_size=4).digest()
+        value = int.from_bytes(digest, 'big') / 0xFFFFFFFF
+        return SimpleNamespace(document_sentiment=SimpleNamespace(score=value * 2 - 1, magnitude=value * 3))
+
+def install_fakes(config, api_key='benchmark-key'):
+    """
+    Replace the process-wide Google clients with fakes
+
+    Must run before the app serves its first request. The YouTube fake is
+    registered for api_key, which should also be the key in the session.
+
+    Args:
+        config: FakeConfig
+        api_key: YouTube API key the fake answers for
+
+    Returns:
+        SimpleNamespace with the youtube, storage and language fakes
+    """
+    from src import data_storage, sentiment_analyzer, youtube_stats
+
+    fakes = SimpleNamespace(
+        youtube=FakeYouTube(config),
+        storage=FakeStorageClient(config),
+        language=FakeLanguageClient(config)
+    )
+    with youtube_stats._client_pool_lock:
+        youtube_stats._client_pool[api_key] = fakes.youtube
+    data_storage._storage_client = fakes.storage
+    data_storage._buckets.clear()
+    sentiment_analyzer._language_client = fakes.language
+    return fakes
+
+def seed_bucket(storage_client, bucket_name, config, snapshots=10, api_key='benchmark-key'):
+    """
+    Store privacy video snapshots in a fake bucket, one per day
+
+    Args:
+        storage_client: FakeStorageClient
+        bucket_name: Bucket to fill
+        config: FakeConfig describing the videos
+        snapshots: Number of snapshots
+        api_key: YouTube API key the fakes were installed for
+
+    Returns:
+        Names of the stored snapshots
+    """
+    from src.data_storage import DataStorage
+    from src.youtube_stats import YouTubeStats
+
+    latency, config.storage_latency = config.storage_latency, 0
+    youtube_latency, config.youtube_latency = config.youtube_latency, 0
+    try:
+        videos = YouTubeStats(api_key)._search_privacy_videos(config.videos)
+        storage = DataStorage(bucket_name)
+        names = []
+        for day in range(snapshots):
+            name = f"privacy_videos_202601{day % 28 + 1:02d}_120000.json"
+            names.append(storage.save_videos_data(videos, name))
+        return names
+    finally:
+        config.storage_latency = latency
+        config.youtube_latency = youtube_latency
@@ -0,0 +1,113 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   benchmarks/lexicon_parity.py
+#       Checks that the vectorized lexicon scorer in
+#       src/sentiment_lexicon.py agrees with TextBlob on a fixed
+#       corpus of comments covering modifiers, negations and "!".
+#
+#       python -m benchmarks.lexicon_parity [--tolerance T]
+#
+#       Exits with status 1 when any comment differs by more
+#       than the tolerance.
+# ╚═══════════════════════════════════════════════════════════╝
+
+import argparse
+import logging
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TOLERANCE = 1e-6
+
+CORPUS = (
+    "This video is good",
+    "This video is not good",
+    "This video is really good",
+    "This video is really not good",
+    "This video is not really good",
+    "This is very not good",
+    "Really really good explanation",
+    "Not a good look for the company",
+    "It isn't bad at all",
+    "I don't think this is terrible",
+    "Never a dull moment, great content!",
+    "Great content!!",
+    "Absolutely terrible privacy policy!",
+    "The app is extremely invasive and honestly scary",
+    "Truly never bad advice from this channel",
+    "Really is not a good idea to share your location",
+    "no good options for privacy these days",
+    "Incredibly helpful, thank you so much",
+    "Horribly bad take, not helpful",
+    "This is awful. Delete your account now!",
+    "Not bad, not great",
+    "The VPN section was surprisingly useful",
+    "I am not sure this is a very safe browser",
+    "Cookies are annoying but the consent banners are worse",
+    "Best explanation of GDPR I have seen",
+    "Worst advice ever, this will get people tracked",
+    "Kind of boring but the tips are solid",
+    "Seriously, never use free VPNs",
+    "Amazing! Subscribed",
+    "Meh",
+    "",
+    "Perfectly clear and not too long",
+    "So sad that nobody cares about data leaks anymore",
+    "Happy to see more people talking about encryption",
+    "The ads tracking part was a little bit creepy",
+    "Not the most exciting video but very important",
+    "Totally wrong about phone permissions",
+    "wonderful wonderful wonderful",
+    "It's fine I guess",
+    "Really not that bad honestly",
+    "You're absolutely right about the cookies",
+    "It's not great, it's really not great",
+    "Can't believe how good this is",
+    "Won't use it, really bad",
+    "Totally! bad idea",
+    "Really ! good stuff, honestly not bad!",
+)
+
+def compare(texts, tolerance=DEFAULT_TOLERANCE):
+    """
+    Score texts with the lexicon and with TextBlob
+
+    Args:
+        texts: Texts to score
+        tolerance: Largest allowed absolute difference in polarity or subjectivity
+
+    Returns:
+        List of (text, lexicon polarity, TextBlob polarity, lexicon subjectivity,
+        TextBlob subjectivity) for every text outside the tolerance
+    """
+    from textblob import TextBlob
+    from src.sentiment_lexicon import SentimentLexicon
+
+    polarity, subjectivity = SentimentLexicon().score(list(texts))
+    mismatches = []
+    for text, lexicon_polarity, lexicon_subjectivity in zip(texts, polarity, subjectivity):
+        expected = TextBlob(text).sentiment
+        if (abs(lexicon_polarity - expected.polarity) > tolerance
+                or abs(lexicon_subjectivity - expected.subjectivity) > tolerance):
+            mismatches.append((text, lexicon_polarity, expected.polarity,
+                               lexicon_subjectivity, expected.subjectivity))
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the lexicon scorer with TextBlob')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='largest allowed difference per comment')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    sys.path.insert(0, ROOT)
+
+    mismatches = compare(CORPUS, args.tolerance)
+    for text, polarity, expected_polarity, subjectivity, expected_subjectivity in mismatches:
+        print(f"{text!r}: polarity {polarity:+.4f} vs {expected_polarity:+.4f}, "
+              f"subjectivity {subjectivity:.4f} vs {expected_subjectivity:.4f}")
+    print(f"{len(CORPUS) - len(mismatches)}/{len(CORPUS)} comments within {args.tolerance:g} of TextBlob")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
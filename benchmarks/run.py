@@ -0,0 +1,243 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   benchmarks/run.py
+#       Drives the main routes through the Flask test client with
+#       the fakes from benchmarks/fakes.py and reports latency
+#       percentiles, throughput and peak memory per route.
+#
+#       python -m benchmarks.run [--requests N] [--concurrency C]
+#                                [--compare results/<commit>.json]
+#
+#       Results are saved to benchmarks/results/<commit>.json so
+#       two commits can be compared with --compare.
+# ╚═══════════════════════════════════════════════════════════╝
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+BUCKET = 'benchmark-bucket'
+API_KEY = 'benchmark-key'
+
+def _isolate_state(directory):
+    """Point every on-disk cache and index at a scratch directory"""
+    os.environ.update({
+        'BLOB_CACHE_DIR': os.path.join(directory, 'blob_cache'),
+        'BLOB_INDEX_PATH': os.path.join(directory, 'blob_index.db'),
+        'TAG_INDEX_PATH': os.path.join(directory, 'tag_index.db'),
+        'SENTIMENT_CACHE_PATH': os.path.join(directory, 'sentiment_cache.db'),
+        'SESSION_DB_PATH': os.path.join(directory, 'sessions.db'),
+        'USERS_DB_URI': 'sqlite:///' + os.path.join(directory, 'users.db'),
+        'LOCAL_STORAGE_ROOT': os.path.join(directory, 'local_storage'),
+        'YOUTUBE_API_KEY': API_KEY,
+        'SENTIMENT_COMMENTS_BUCKET': BUCKET,
+    })
+
+def _routes(snapshot, video_id):
+    """Name and URL of every benchmarked route"""
+    return [
+        ('youtube_privacy', '/youtube_privacy'),
+        ('tag_analysis', '/tag_analysis'),
+        ('sentiment', f'/sentiment?video_id={video_id}'),
+        ('storage_manager', '/storage_manager'),
+        ('summarize_json', f'/summarize_json?bucket_name={BUCKET}&source_blob_name={snapshot}'),
+    ]
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+        session['storage_bucket'] = BUCKET
+        session['youtube_api_key'] = API_KEY
+    return client
+
+def _timed_get(client, url):
+    started = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return elapsed
+
+def bench_route(app, user_id, url, requests, concurrency, warmup, memory_requests):
+    """
+    Measure one route
+
+    Args:
+        app: Flask app with the fakes installed
+        user_id: Id of the user the requests run as
+        url: URL to request
+        requests: Timed requests
+        concurrency: Clients sending requests at the same time
+        warmup: Untimed requests sent first
+        memory_requests: Requests sent again under tracemalloc for the peak memory
+
+    Returns:
+        Dictionary with latency percentiles (ms), throughput and peak memory
+    """
+    clients = [_client(app, user_id) for _ in range(max(concurrency, 1))]
+    for _ in range(warmup):
+        _timed_get(clients[0], url)
+
+    latencies = []
+    started = time.perf_counter()
+    if concurrency <= 1:
+        latencies = [_timed_get(clients[0], url) for _ in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(_timed_get, clients[i % concurrency], url) for i in range(requests)]
+            latencies = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        for _ in range(memory_requests):
+            _timed_get(clients[0], url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'throughput_rps': requests / wall if wall else None,
+        'peak_memory_kib': peak / 1024
+    }
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def commit_label():
+    """Short hash of HEAD, suffixed with -dirty when the tree has local changes"""
+    commit = _git('rev-parse', '--short', 'HEAD') or 'unknown'
+    if _git('status', '--porcelain', '--untracked-files=no'):
+        commit += '-dirty'
+    return commit
+
+def format_results(results, baseline=None):
+    """Render the route results as a table, with changes against a baseline run if given"""
+    header = f"{'route':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'peak KiB':>11}"
+    lines = [header, '-' * len(header)]
+    for name, result in results['routes'].items():
+        lines.append(f"{name:<18}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+                     f"{result['throughput_rps']:>9.1f}{result['peak_memory_kib']:>11.0f}")
+        before = (baseline or {}).get('routes', {}).get(name)
+        if before:
+            deltas = [
+                _delta(result[key], before[key]) for key in
+                ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'peak_memory_kib')
+            ]
+            lines.append(f"{'  vs ' + baseline['commit']:<18}{deltas[0]:>10}{deltas[1]:>10}{deltas[2]:>10}"
+                         f"{deltas[3]:>9}{deltas[4]:>11}")
+    return '\n'.join(lines)
+
+def _delta(now, before):
+    if not before:
+        return 'n/a'
+    return f"{(now - before) / before * 100:+.0f}%"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the routes against local fakes')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--concurrency', type=int, default=1, help='clients sending requests at once')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per route')
+    parser.add_argument('--memory-requests', type=int, default=3, help='requests traced for peak memory')
+    parser.add_argument('--routes', help='comma separated subset of routes to run')
+    parser.add_argument('--snapshots', type=int, default=10, help='video snapshots stored in the fake bucket')
+    parser.add_argument('--youtube-latency', type=float, default=0.05, help='seconds per YouTube call')
+    parser.add_argument('--storage-latency', type=float, default=0.02, help='seconds per GCS call')
+    parser.add_argument('--language-latency', type=float, default=0.03, help='seconds per Language call')
+    parser.add_argument('--videos', type=int, default=20, help='videos returned by a search')
+    parser.add_argument('--comments', type=int, default=300, help='comments on each video')
+    parser.add_argument('--description-chars', type=int, default=1500, help='length of video descriptions')
+    parser.add_argument('--comment-chars', type=int, default=200, help='length of comments')
+    parser.add_argument('--output', help='where to save the results, default benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', help='earlier results file to compare with')
+    args = parser.parse_args(argv)
+
+    # Labelled before anything runs, so the run itself can never mark the tree dirty
+    commit = commit_label()
+    scratch = tempfile.mkdtemp(prefix='yt-bench-')
+    _isolate_state(scratch)
+    logging.disable(logging.WARNING)
+    sys.path.insert(0, ROOT)
+
+    from benchmarks.fakes import FakeConfig, install_fakes, seed_bucket
+    from src.app import create_app
+    from src.models import User
+
+    config = FakeConfig(
+        youtube_latency=args.youtube_latency,
+        storage_latency=args.storage_latency,
+        language_latency=args.language_latency,
+        videos=args.videos,
+        comments_per_video=args.comments,
+        description_chars=args.description_chars,
+        comment_chars=args.comment_chars
+    )
+    app = create_app()
+    fakes = install_fakes(config, API_KEY)
+    snapshots = seed_bucket(fakes.storage, BUCKET, config, args.snapshots, API_KEY)
+    with app.app_context():
+        user_id = User.query.filter_by(username='admin').first().id
+
+    routes = _routes(snapshots[-1], next(iter(fakes.youtube._videos)))
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = [route for route in routes if route[0] in wanted]
+
+    results = {
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {**config.to_dict(), 'snapshots': args.snapshots, 'warmup': args.warmup},
+        'routes': {}
+    }
+    for name, url in routes:
+        print(f"Benchmarking {name} ...", file=sys.stderr)
+        results['routes'][name] = bench_route(app, user_id, url, args.requests, args.concurrency,
+                                              args.warmup, args.memory_requests)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print(format_results(results, baseline))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
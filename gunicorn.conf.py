@@ -0,0 +1,47 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   gunicorn.conf.py
+#       Pre-fork serving settings for wsgi:app. Workers and
+#       threads come from the environment, the app is created
+#       once in the master and each worker warms its own API
+#       clients after the fork.
+#
+#       kill -HUP <master pid> starts fresh workers and lets the
+#       old ones finish their requests. The preloaded app itself
+#       is only rebuilt by a full restart.
+#
+#       Background jobs (storage uploads, sentiment runs) and their
+#       status live in the worker that started them, so the default
+#       is one worker. With more, a status poll can land on a worker
+#       that never saw the job.
+# ╚═══════════════════════════════════════════════════════════╝
+import os
+
+bind = f"0.0.0.0:{int(os.environ.get('PORT', 8080))}"
+
+# One worker by default, the job queue and metrics are per process. Threads let
+# it keep serving while requests wait on YouTube or GCS.
+workers = int(os.environ.get('WEB_WORKERS', 1))
+threads = int(os.environ.get('WEB_THREADS', 8))
+worker_class = 'gthread'
+
+preload_app = True
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+
+# Recycle workers after this many requests (0 disables), with jitter so they don't restart together
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+def when_ready(server):
+    if workers > 1:
+        server.log.warning(f"Running {workers} workers: job status polls and /metrics only "
+                           f"see the worker that answers them")
+
+def post_fork(server, worker):
+    from src.app import init_worker
+    init_worker(server.app.wsgi())
+    server.log.info(f"Worker {worker.pid} ready")
@@ -1,12 +1,43 @@
 # ╔═══════════════════════════════════════════════════════════╗
 #   main.py
 #       All this does is create the app and let src folder
-#       do its thing.
+#       do its thing. Runs the development server, production
+#       serving goes through gunicorn and wsgi.py.
+#
+#       --startup-report prints an import time breakdown of a
+#       cold start. It fails when the first request does not
+#       return 200, and with --max-seconds when the time to the
+#       first request is over the limit.
 # ╚═══════════════════════════════════════════════════════════╝
-from src.app import create_app
+import argparse
 import os
+import sys
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the development server')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='measure a cold start and print an import time breakdown')
+    parser.add_argument('--max-seconds', type=float,
+                        help='with --startup-report, exit with status 1 if the first request takes longer')
+    parser.add_argument('--top', type=int, default=15, help='modules listed in the startup report')
+    parser.add_argument('--json', action='store_true', help='print the startup report as JSON')
+    args = parser.parse_args()
+
+    if args.startup_report:
+        from src.utils.startup_report import format_startup_report, startup_report
+        import json
+        report = startup_report(top=args.top)
+        print(json.dumps(report, indent=2) if args.json else format_startup_report(report))
+        if report['status'] != 200:
+            print(f"First request returned status {report['status']}", file=sys.stderr)
+            sys.exit(1)
+        if args.max_seconds is not None and report['total_seconds'] > args.max_seconds:
+            print(f"Time to first request {report['total_seconds']:.2f}s is over the "
+                  f"{args.max_seconds:.2f}s limit", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    from src.app import create_app
     app = create_app()
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port)
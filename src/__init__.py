@@ -2,13 +2,29 @@
 
 # Optional: Set up package-level logging configurations
 import logging
+import importlib
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
 
-# Optional: Explicit relative imports
-from .youtube_stats import YouTubeStats
-from .sentiment_analyzer import SentimentAnalyzer, LocalSentimentAnalyzer
-from .data_storage import DataStorage
\ No newline at end of file
+# Package-level shortcuts, imported on first access so that importing any
+# src module does not pull in the Google SDKs
+_EXPORTS = {
+    'YouTubeStats': '.youtube_stats',
+    'SentimentAnalyzer': '.sentiment_analyzer',
+    'LocalSentimentAnalyzer': '.sentiment_analyzer',
+    'LexiconSentimentAnalyzer': '.sentiment_analyzer',
+    'DataStorage': '.data_storage',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
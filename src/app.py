@@ -3,12 +3,15 @@
 #       Initalizes the application for the webiste.
 # ╚═══════════════════════════════════════════════════════════╝
 
-from flask import Flask
+from flask import Flask, g, request, before_render_template, template_rendered
 from flask_login import LoginManager
+from sqlalchemy import event
 from datetime import datetime
 import logging
 import os
-from src.models import db, User
+import time
+from src.models import db, User, load_cached_user
+from src.session_store import SqliteSessionInterface
 from werkzeug.security import generate_password_hash
 from src.routes import (
     main_bp,
@@ -20,20 +23,100 @@ from src.routes import (
     admin_bp
 )
 from src.utils.filters import format_date
+from src.utils.metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Users database, a relative sqlite path is placed in the instance folder.
+# Created with the admin account on first start.
+USERS_DB_URI = os.environ.get('USERS_DB_URI', 'sqlite:///users.db')
+
+# Connections kept open for concurrent readers of the users database
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+
 login_manager = LoginManager()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_cached_user(int(user_id))
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Duration of requests by route',
+    ('endpoint', 'method', 'status')
+)
+TEMPLATE_SECONDS = REGISTRY.histogram(
+    'template_render_duration_seconds',
+    'Duration of template rendering',
+    ('template',)
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'db_query_duration_seconds',
+    'Duration of queries on the users database',
+    ('operation',)
+)
+
+def _register_metrics(app):
+    """Time every request, template render and users database query"""
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Unmatched URLs share one label so 404 scans can't grow the series
+            REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                    endpoint=request.endpoint or 'unmatched',
+                                    method=request.method, status=str(response.status_code))
+        return response
+
+    def start_render(sender, template, context, **extra):
+        g.setdefault('render_started', []).append(time.perf_counter())
+
+    def record_render(sender, template, context, **extra):
+        stack = g.get('render_started')
+        if stack:
+            TEMPLATE_SECONDS.observe(time.perf_counter() - stack.pop(), template=template.name or 'string')
+
+    # Signals hold receivers weakly by default, these are local functions
+    before_render_template.connect(start_render, app, weak=False)
+    template_rendered.connect(record_render, app, weak=False)
+
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('query_started')
+    if stack:
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        DB_QUERY_SECONDS.observe(time.perf_counter() - stack.pop(), operation=operation)
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Let readers run alongside the writer and wait for locks instead of failing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
 
 def create_app():
     app = Flask(__name__, template_folder='templates')
     app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'your_secret_key_here')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = USERS_DB_URI
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_pre_ping': True,
+        'connect_args': {'check_same_thread': False, 'timeout': 5}
+    }
+
+    # Keep sessions server side, SESSION_BACKEND=cookie restores Flask's signed cookies
+    if os.environ.get('SESSION_BACKEND', 'sqlite') == 'sqlite':
+        app.session_interface = SqliteSessionInterface()
 
     # Initialize extensions
     db.init_app(app)
@@ -49,6 +132,8 @@ def create_app():
     app.register_blueprint(analysis_bp)
     app.register_blueprint(admin_bp)
 
+    _register_metrics(app)
+
     # Register template filters
     app.template_filter('format_date')(format_date)
 
@@ -59,6 +144,9 @@ def create_app():
 
     # Initialize database and create admin user
     with app.app_context():
+        event.listen(db.engine, 'connect', _configure_sqlite)
+        event.listen(db.engine, 'before_cursor_execute', _start_query)
+        event.listen(db.engine, 'after_cursor_execute', _record_query)
         db.create_all()
         if not User.query.filter_by(username='admin').first():
             admin = User(
@@ -69,4 +157,32 @@ def create_app():
             db.session.add(admin)
             db.session.commit()
 
-    return app
\ No newline at end of file
+    return app
+
+def init_worker(app):
+    """
+    Prepare a worker process forked from a preloaded app
+
+    Connections the parent opened are dropped so the worker opens its own,
+    and the API clients are built now so the first request does not pay
+    for it. A client that cannot be built is logged and built on first use.
+
+    Args:
+        app: The app created before forking
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    from src.data_storage import get_storage_client
+    from src.sentiment_analyzer import get_language_client
+    from src.youtube_stats import get_youtube_client
+
+    api_key = os.environ.get('YOUTUBE_API_KEY')
+    warmups = [('GCS', get_storage_client), ('Natural Language', get_language_client)]
+    if api_key:
+        warmups.append(('YouTube', lambda: get_youtube_client(api_key)))
+    for name, warm in warmups:
+        try:
+            warm()
+        except Exception as e:
+            logger.warning(f"Could not warm up the {name} client in worker {os.getpid()}: {str(e)}")
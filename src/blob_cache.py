@@ -0,0 +1,201 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   blob_cache.py
+#       Local read-through cache of downloaded blobs. Files are
+#       keyed by bucket, name and generation, so a cached copy
+#       is only ever used for the exact object version it holds
+# ╚═══════════════════════════════════════════════════════════╝
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'blob_cache'
+)
+
+# Seconds after which a leftover .tmp- file (from a crashed write) is deleted
+TMP_MAX_AGE = int(os.environ.get('BLOB_CACHE_TMP_MAX_AGE', 3600))
+
+class BlobCache:
+    """
+    Directory of cached blob versions with an LRU size limit.
+
+    The byte total and the cached generation of each blob are tracked in
+    memory, so storing a file does not list the directory. The directory
+    is only scanned on start-up and when the total goes over max_bytes,
+    which also corrects the total for files other processes added or
+    removed.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            directory: Folder holding the cached files
+            max_bytes: Total size kept before the least recently used files are evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sizes = {}
+        self._current = {}
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._scan()
+
+    def _prefix(self, bucket_name, blob_name):
+        return hashlib.sha256(f"{bucket_name}\x00{blob_name}".encode('utf-8')).hexdigest()
+
+    def _path(self, bucket_name, blob_name, generation):
+        return os.path.join(self.directory, f"{self._prefix(bucket_name, blob_name)}-{generation}")
+
+    def get(self, bucket_name, blob_name, generation):
+        """
+        Look up the cached copy of one object version
+
+        Args:
+            bucket_name: Bucket of the blob
+            blob_name: Name of the blob
+            generation: Generation the copy must match
+
+        Returns:
+            Path of the cached file, or None
+        """
+        path = self._path(bucket_name, blob_name, generation)
+        try:
+            # Touching the file keeps it at the recent end of the LRU order
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, bucket_name, blob_name, generation, chunks):
+        """
+        Store an object version, replacing older generations of the same blob
+
+        Args:
+            bucket_name: Bucket of the blob
+            blob_name: Name of the blob
+            generation: Generation being stored
+            chunks: Iterable of byte chunks with the object's content
+
+        Returns:
+            Path of the cached file
+        """
+        path = self._path(bucket_name, blob_name, generation)
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        prefix = self._prefix(bucket_name, blob_name)
+        with self._lock:
+            previous = self._current.get(prefix)
+            if previous is not None and previous != path:
+                self._remove(previous)
+            self._total += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            self._current[prefix] = path
+            if self._total > self.max_bytes:
+                self._evict()
+        return path
+
+    def _remove(self, path):
+        """Delete a cached file and drop it from the totals, called with the lock held"""
+        _unlink(path)
+        self._total -= self._sizes.pop(path, 0)
+        prefix = os.path.basename(path).rsplit('-', 1)[0]
+        if self._current.get(prefix) == path:
+            del self._current[prefix]
+
+    def _scan(self):
+        """
+        Rebuild the totals from the directory and delete stale temporary files
+
+        Returns:
+            List of (mtime, path) of the cached files
+        """
+        entries = []
+        newest = {}
+        self._sizes = {}
+        self._total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith('.tmp-'):
+                # Left behind by a write that crashed, live writes are younger
+                if now - stat.st_mtime > TMP_MAX_AGE:
+                    _unlink(entry.path)
+                continue
+            self._sizes[entry.path] = stat.st_size
+            self._total += stat.st_size
+            entries.append((stat.st_mtime, entry.path))
+            prefix = entry.name.rsplit('-', 1)[0]
+            if prefix not in newest or newest[prefix][0] < stat.st_mtime:
+                newest[prefix] = (stat.st_mtime, entry.path)
+        self._current = {prefix: path for prefix, (_, path) in newest.items()}
+        return entries
+
+    def _evict(self):
+        """Delete the least recently used files until the cache fits in max_bytes"""
+        # Rescan, so the order follows the access times and files written
+        # by other processes are counted
+        entries = self._scan()
+        if self._total <= self.max_bytes:
+            return
+        for _, path in sorted(entries):
+            self._remove(path)
+            logger.debug(f"Evicted {path} from blob cache")
+            if self._total <= self.max_bytes:
+                break
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_blob_cache():
+    """
+    Return the process-wide blob cache
+
+    Returns:
+        A BlobCache, or None if caching is disabled or unavailable
+    """
+    global _cache
+    if _cache is None:
+        max_bytes = int(os.environ.get('BLOB_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        if max_bytes <= 0:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = BlobCache(os.environ.get('BLOB_CACHE_DIR', DEFAULT_CACHE_DIR), max_bytes)
+                except Exception as e:
+                    logger.error(f"Error opening blob cache: {str(e)}")
+                    return None
+    return _cache
@@ -0,0 +1,234 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   blob_index.py
+#       Local SQLite index of the blobs in each bucket so the
+#       storage pages can page, filter and count files without
+#       listing the whole bucket on every view
+# ╚═══════════════════════════════════════════════════════════╝
+
+from datetime import datetime
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'blob_index.db'
+)
+
+# Snapshot names end in a timestamp, optionally followed by a random suffix
+_NAME_TIMESTAMP_RE = re.compile(r'_(\d{8})_?(\d{6})?(?:_[0-9a-f]{8})?\.')
+_COMMENTS_NAME_RE = re.compile(r'^comments_(.+)_\d{8}_?\d{6}(?:_[0-9a-f]{8})?\.')
+
+# Types of the content_type values DataStorage writes, and the name prefixes
+# used for files that carry no metadata
+_CONTENT_TYPES = {'youtube_videos': 'videos', 'youtube_comments': 'comments'}
+_NAME_PREFIXES = (('privacy_videos_', 'videos'), ('comments_', 'comments'))
+
+# Bumped when classify_blob changes, older indexes are cleared and rebuilt
+# from the next bucket listing
+INDEX_VERSION = 1
+
+def classify_blob(name, metadata=None, updated=None):
+    """
+    Work out the type, video id and timestamp of a stored file
+
+    Args:
+        name: Blob name
+        metadata: Custom metadata written by DataStorage, if any
+        updated: Last update time reported by the bucket, if any
+
+    Returns:
+        Tuple of (type, video_id, ISO timestamp)
+    """
+    metadata = metadata or {}
+    content_type = metadata.get('content_type')
+    if content_type:
+        # The metadata is authoritative, the name may contain anything (e.g. a video id)
+        blob_type = _CONTENT_TYPES.get(content_type, 'data')
+    else:
+        blob_type = next((kind for prefix, kind in _NAME_PREFIXES if name.startswith(prefix)), 'data')
+
+    video_id = metadata.get('video_id')
+    if not video_id and blob_type == 'comments':
+        match = _COMMENTS_NAME_RE.match(name)
+        video_id = match.group(1) if match else None
+
+    timestamp = metadata.get('uploaded_at')
+    if not timestamp:
+        match = _NAME_TIMESTAMP_RE.search(name)
+        if match:
+            try:
+                timestamp = datetime.strptime(match.group(1) + (match.group(2) or '000000'),
+                                              '%Y%m%d%H%M%S').isoformat()
+            except ValueError:
+                timestamp = None
+    if not timestamp and updated:
+        timestamp = updated.isoformat()
+
+    return blob_type, video_id, timestamp
+
+class BlobIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        """
+        Open (or create) the SQLite index
+
+        Args:
+            path: Location of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                bucket TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER,
+                generation INTEGER,
+                type TEXT,
+                video_id TEXT,
+                timestamp TEXT,
+                PRIMARY KEY (bucket, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_blobs_type ON blobs (bucket, type, name);
+            CREATE TABLE IF NOT EXISTS refreshes (
+                bucket TEXT PRIMARY KEY,
+                refreshed_at REAL NOT NULL
+            );
+        ''')
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] < INDEX_VERSION:
+            self._conn.execute('DELETE FROM blobs')
+            self._conn.execute('DELETE FROM refreshes')
+            self._conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+        self._conn.commit()
+
+    def record(self, bucket_name, name, size=None, generation=None, metadata=None, updated=None):
+        """Add or update one blob, used right after our own writes"""
+        blob_type, video_id, timestamp = classify_blob(name, metadata, updated)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO blobs (bucket, name, size, generation, type, video_id, timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (bucket_name, name, size, generation, blob_type, video_id, timestamp)
+            )
+            self._conn.commit()
+
+    def remove(self, bucket_name, name):
+        """Drop one blob from the index"""
+        with self._lock:
+            self._conn.execute('DELETE FROM blobs WHERE bucket = ? AND name = ?', (bucket_name, name))
+            self._conn.commit()
+
+    def sync(self, bucket_name, blobs):
+        """
+        Bring the index in line with a full bucket listing
+
+        Only blobs whose generation changed are rewritten, and blobs that
+        are no longer listed are removed.
+
+        Args:
+            bucket_name: Bucket that was listed
+            blobs: Iterable of Blob objects from the listing
+
+        Returns:
+            Number of added or updated rows
+        """
+        with self._lock:
+            known = dict(self._conn.execute(
+                'SELECT name, generation FROM blobs WHERE bucket = ?', (bucket_name,)
+            ).fetchall())
+
+        changed = []
+        seen = set()
+        for blob in blobs:
+            seen.add(blob.name)
+            if known.get(blob.name) == blob.generation:
+                continue
+            blob_type, video_id, timestamp = classify_blob(blob.name, blob.metadata, blob.updated)
+            changed.append((bucket_name, blob.name, blob.size, blob.generation, blob_type, video_id, timestamp))
+        removed = [(bucket_name, name) for name in known if name not in seen]
+
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO blobs (bucket, name, size, generation, type, video_id, timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                changed
+            )
+            self._conn.executemany('DELETE FROM blobs WHERE bucket = ? AND name = ?', removed)
+            self._conn.execute('INSERT OR REPLACE INTO refreshes (bucket, refreshed_at) VALUES (?, ?)',
+                               (bucket_name, time.time()))
+            self._conn.commit()
+        if changed or removed:
+            logger.info(f"Blob index for {bucket_name}: {len(changed)} updated, {len(removed)} removed")
+        return len(changed)
+
+    def refreshed_at(self, bucket_name):
+        """Return when the bucket was last synced, or None if never"""
+        with self._lock:
+            row = self._conn.execute('SELECT refreshed_at FROM refreshes WHERE bucket = ?',
+                                     (bucket_name,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, bucket_name, prefix=None, blob_type=None, offset=0, limit=50):
+        """
+        Page through the indexed blobs of a bucket, newest names first
+
+        Args:
+            bucket_name: Bucket to query
+            prefix: Optional name prefix filter
+            blob_type: Optional type filter ('videos', 'comments' or 'data')
+            offset: Rows to skip
+            limit: Maximum rows to return
+
+        Returns:
+            Tuple of (list of row dictionaries, total matching rows)
+        """
+        where = 'bucket = ?'
+        params = [bucket_name]
+        if prefix:
+            # Escape LIKE wildcards so the prefix is matched literally
+            escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where += " AND name LIKE ? ESCAPE '\\'"
+            params.append(escaped + '%')
+        if blob_type:
+            where += ' AND type = ?'
+            params.append(blob_type)
+
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM blobs WHERE {where}', params).fetchone()[0]
+            rows = self._conn.execute(
+                f'SELECT name, size, generation, type, video_id, timestamp FROM blobs WHERE {where} '
+                'ORDER BY name DESC LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+_index = None
+_index_failed = False
+_index_lock = threading.Lock()
+
+def get_blob_index():
+    """
+    Return the process-wide blob index
+
+    Returns:
+        A BlobIndex, or None if it could not be opened. An index that failed
+        to open is not retried until the process restarts.
+    """
+    global _index, _index_failed
+    if _index is None and not _index_failed:
+        with _index_lock:
+            if _index is None and not _index_failed:
+                try:
+                    _index = BlobIndex(os.environ.get('BLOB_INDEX_PATH', DEFAULT_INDEX_PATH))
+                except Exception as e:
+                    logger.error(f"Error opening blob index, listing without it: {str(e)}")
+                    _index_failed = True
+    return _index
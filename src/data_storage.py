@@ -3,15 +3,149 @@
 #       Handles the data storage for the website
 # ╚═══════════════════════════════════════════════════════════╝
 
-from google.cloud import storage
+from src.blob_cache import get_blob_cache
+from src.blob_index import get_blob_index
+from src.utils.metrics import timed
+from src.storage_backends import is_local_bucket, open_local_bucket
+from src.snapshot_format import (FORMAT_COLUMNAR, FORMAT_JSON, FORMAT_NDJSON, FORMATS, CONTENT_TYPES,
+                                 HEADER_READ_SIZE, ColumnarReader, decode_snapshot, detect_format,
+                                 encode_snapshot, iter_ndjson_records, project_record, snapshot_name)
+from contextlib import contextmanager
+import gzip
+import hashlib
+import io
+import itertools
 import json
+import mmap
 from datetime import datetime
 import logging
 from flask import session
 import os
+import threading
+import time
+import uuid
+import ijson
 
 logger = logging.getLogger(__name__)
 
+# Bytes fetched per ranged request when streaming a blob
+STREAM_CHUNK_SIZE = int(os.environ.get('STORAGE_STREAM_CHUNK_SIZE', 1024 * 1024))
+
+# Format new snapshots are written in: 'json', 'ndjson' (gzip) or 'columnar'
+SNAPSHOT_FORMAT = os.environ.get('STORAGE_SNAPSHOT_FORMAT', FORMAT_JSON)
+if SNAPSHOT_FORMAT not in FORMATS:
+    logger.warning(f"Unknown STORAGE_SNAPSHOT_FORMAT {SNAPSHOT_FORMAT!r}, writing JSON snapshots")
+    SNAPSHOT_FORMAT = FORMAT_JSON
+
+# Seconds before the local blob index is refreshed from the bucket listing
+INDEX_REFRESH_SECONDS = int(os.environ.get('BLOB_INDEX_REFRESH_SECONDS', 60))
+
+# Buckets whose index is currently being refreshed in the background
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# Process-wide storage client and bucket handles. The bucket existence check
+# runs once per bucket and is repeated only after an operation on it fails.
+_storage_client = None
+_buckets = {}
+_registry_lock = threading.Lock()
+
+def get_storage_client():
+    """Return the shared Google Cloud Storage client, creating it on first use"""
+    global _storage_client
+    if _storage_client is None:
+        with _registry_lock:
+            if _storage_client is None:
+                # Imported here, google-cloud-storage and gRPC are slow to import
+                from google.cloud import storage
+                _storage_client = storage.Client()
+    return _storage_client
+
+def get_bucket(bucket_name):
+    """
+    Return the shared handle for a bucket, creating the bucket if it doesn't exist
+
+    Args:
+        bucket_name: Name of the GCS bucket, or a "local:<name>" / "file:///path" setting
+
+    Returns:
+        A google.cloud.storage Bucket, or a LocalBucket for local settings
+    """
+    bucket = _buckets.get(bucket_name)
+    if bucket is not None:
+        return bucket
+
+    if is_local_bucket(bucket_name):
+        return _buckets.setdefault(bucket_name, open_local_bucket(bucket_name))
+
+    # No lock is held for the network calls. Threads racing on a new bucket
+    # may both look it up, the first handle published wins.
+    client = get_storage_client()
+    try:
+        # Try to get the bucket
+        with timed('gcs', 'get_bucket'):
+            bucket = client.get_bucket(bucket_name)
+        logger.debug(f"Using existing bucket: {bucket_name}")
+    except Exception as e:
+        # If bucket does not exist, create it
+        logger.info(f"Bucket {bucket_name} does not exist. Creating...")
+        try:
+            with timed('gcs', 'create_bucket'):
+                bucket = client.create_bucket(bucket_name)
+            logger.info(f"Bucket {bucket.name} created successfully.")
+        except Exception as create_error:
+            bucket = _buckets.get(bucket_name)
+            if bucket is not None:
+                # Another thread created it first
+                return bucket
+            logger.error(f"Failed to create bucket {bucket_name}: {str(create_error)}")
+            raise RuntimeError(f"Failed to create bucket: {str(create_error)}") from create_error
+    return _buckets.setdefault(bucket_name, bucket)
+
+def unique_blob_base(prefix, timestamp_format="%Y%m%d_%H%M%S"):
+    """
+    Build a snapshot name (without extension) that two writers never share
+
+    The timestamp only has second resolution, so a random suffix keeps
+    writes made in the same second from colliding.
+
+    Args:
+        prefix: Name prefix, e.g. "privacy_videos"
+        timestamp_format: strftime format of the timestamp part
+
+    Returns:
+        Name such as privacy_videos_20250101_120000_1a2b3c4d
+    """
+    return f"{prefix}_{datetime.now().strftime(timestamp_format)}_{uuid.uuid4().hex[:8]}"
+
+def invalidate_bucket(bucket_name):
+    """Forget a cached bucket handle so the next use checks the bucket again"""
+    with _registry_lock:
+        _buckets.pop(bucket_name, None)
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = b''
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._offset >= len(self._chunk):
+            try:
+                self._chunk = next(self._chunks)
+                self._offset = 0
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
 class DataStorage:
     def __init__(self, bucket_name=None):
         """
@@ -24,35 +158,29 @@ class DataStorage:
             # Allow bucket name to be overridden by session if available
             self.bucket_name = bucket_name or session.get('storage_bucket', 'itc-388-youtube-r6')
             
-            # Initialize Google Cloud Storage client - remove the credentials check
-            # In Cloud Run, we don't need to explicitly set GOOGLE_APPLICATION_CREDENTIALS
-            # as the credentials are automatically available
-            self.storage_client = storage.Client()
+            # Local buckets live on disk, skip the network client and the local blob cache
+            self.is_local = is_local_bucket(self.bucket_name)
+            self.service = 'local_storage' if self.is_local else 'gcs'
+            
+            # Shared Google Cloud Storage client - in Cloud Run, we don't need to explicitly
+            # set GOOGLE_APPLICATION_CREDENTIALS as the credentials are automatically available
+            self.storage_client = None if self.is_local else get_storage_client()
             
             # Ensure bucket exists
             self._ensure_bucket_exists()
             
-            logger.info(f"Initialized DataStorage with bucket: {self.bucket_name}")
+            logger.debug(f"Initialized DataStorage with bucket: {self.bucket_name}")
         except Exception as e:
             logger.error(f"Error initializing DataStorage: {str(e)}")
             raise RuntimeError(f"Failed to initialize storage: {str(e)}") from e
     
     def _ensure_bucket_exists(self):
         """Ensure the bucket exists, create if it doesn't"""
-        try:
-            # Try to get the bucket
-            self.bucket = self.storage_client.get_bucket(self.bucket_name)
-            logger.debug(f"Using existing bucket: {self.bucket_name}")
-        except Exception as e:
-            # If bucket does not exist, create it
-            logger.info(f"Bucket {self.bucket_name} does not exist. Creating...")
-            try:
-                # Check if we have permissions to create a bucket
-                self.bucket = self.storage_client.create_bucket(self.bucket_name)
-                logger.info(f"Bucket {self.bucket.name} created successfully.")
-            except Exception as create_error:
-                logger.error(f"Failed to create bucket {self.bucket_name}: {str(create_error)}")
-                raise RuntimeError(f"Failed to create bucket: {str(create_error)}") from create_error
+        self.bucket = get_bucket(self.bucket_name)
+
+    def _invalidate_bucket(self):
+        """Drop the cached bucket handle after a failed operation"""
+        invalidate_bucket(self.bucket_name)
     
     def verify_connection(self):
         """
@@ -63,28 +191,104 @@ class DataStorage:
         """
         try:
             # Check if we can list buckets (general access)
-            _ = list(self.storage_client.list_buckets(max_results=1))
+            if self.storage_client is not None:
+                with timed(self.service, 'list_buckets'):
+                    _ = list(self.storage_client.list_buckets(max_results=1))
             
             # Check if we can list blobs in the specific bucket (specific access)
-            _ = list(self.bucket.list_blobs(max_results=1))
+            with timed(self.service, 'list'):
+                _ = list(self.bucket.list_blobs(max_results=1))
             
             # Try to create a temporary test blob (write access)
             test_blob = self.bucket.blob('_test_permissions')
-            test_blob.upload_from_string('test', content_type='text/plain')
-            test_blob.delete()
+            with timed(self.service, 'upload'):
+                test_blob.upload_from_string('test', content_type='text/plain')
+            with timed(self.service, 'delete'):
+                test_blob.delete()
             
             return True
         except Exception as e:
             logger.error(f"Connection verification failed: {str(e)}")
+            self._invalidate_bucket()
             return False
     
-    def save_videos_data(self, videos_data, blob_name=None):
+    def _upload_json(self, blob, data_json, metadata, if_generation_match=None, content_type="application/json"):
+        """
+        Upload a snapshot and its metadata in a single request
+        
+        The upload response carries the new generation and size, so no
+        follow-up request is needed to confirm the write. A SHA-256 of the
+        content is stored in the metadata, so a create (if_generation_match=0)
+        that fails its precondition is only treated as done when the existing
+        object holds exactly the same bytes, i.e. it was a retry of this write.
+        
+        Args:
+            blob: Blob to write
+            data_json: Serialized snapshot, a string or bytes
+            metadata: Custom metadata dictionary stored with the object
+            if_generation_match: Optional precondition, 0 only creates a new object
+            content_type: Content type stored with the object
+            
+        Returns:
+            True if the object was written
+        """
+        from google.api_core.exceptions import PreconditionFailed
+        data_bytes = data_json.encode('utf-8') if isinstance(data_json, str) else data_json
+        content_sha256 = hashlib.sha256(data_bytes).hexdigest()
+        metadata = {**metadata, 'content_sha256': content_sha256}
+        blob.metadata = metadata
+        try:
+            with timed(self.service, 'upload'):
+                blob.upload_from_string(
+                    data_json,
+                    content_type=content_type,
+                    if_generation_match=if_generation_match
+                )
+        except PreconditionFailed:
+            if if_generation_match == 0 and self._is_same_upload(blob, content_sha256):
+                # A retried create whose first attempt already landed
+                logger.warning(f"Blob {blob.name} already holds this upload, treating it as done")
+                self._index_blob(blob, blob.metadata)
+                return True
+            logger.error(f"Generation precondition failed for {blob.name}")
+            return False
+        
+        if blob.generation is None:
+            logger.error(f"Upload of {blob.name} returned no generation")
+            return False
+        logger.debug(f"Wrote {blob.name} generation {blob.generation} ({blob.size} bytes)")
+        self._index_blob(blob, metadata)
+        return True
+
+    def _is_same_upload(self, blob, content_sha256):
+        """Reload an existing blob and check whether it holds the given content"""
+        try:
+            with timed(self.service, 'reload'):
+                blob.reload()
+        except Exception as e:
+            logger.error(f"Error reloading {blob.name}: {str(e)}")
+            return False
+        return blob.generation is not None and (blob.metadata or {}).get('content_sha256') == content_sha256
+
+    def _index_blob(self, blob, metadata):
+        """Add a blob we just wrote to the local index"""
+        index = get_blob_index()
+        if index is None:
+            return
+        try:
+            index.record(self.bucket_name, blob.name, blob.size, blob.generation, metadata)
+        except Exception as e:
+            logger.error(f"Error indexing {blob.name}: {str(e)}")
+
+    def save_videos_data(self, videos_data, blob_name=None, if_generation_match=None, snapshot_format=None):
         """
         Save videos data to Cloud Storage
         
         Args:
             videos_data: List of video dictionaries to save
             blob_name: Optional custom name for the blob
+            if_generation_match: Optional generation precondition, 0 makes retries idempotent
+            snapshot_format: 'json', 'ndjson' or 'columnar', defaults to STORAGE_SNAPSHOT_FORMAT
         
         Returns:
             Blob name of the saved data or None if failed
@@ -99,10 +303,11 @@ class DataStorage:
                 logger.error(f"Invalid data type: {type(videos_data)}")
                 return None
             
+            snapshot_format = snapshot_format or SNAPSHOT_FORMAT
+            
             # Generate a default blob name if not provided
             if blob_name is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                blob_name = f"privacy_videos_{timestamp}.json"
+                blob_name = snapshot_name(unique_blob_base("privacy_videos"), snapshot_format)
             
             # Log what we're about to upload for debugging
             logger.info(f"Preparing to upload {len(videos_data) if isinstance(videos_data, list) else '?'} videos to {blob_name}")
@@ -110,7 +315,7 @@ class DataStorage:
             # Reference to the blob
             blob = self.bucket.blob(blob_name)
             
-            # Convert data to JSON with proper formatting
+            # Convert data to the snapshot format
             # Add better error handling for non-serializable objects
             try:
                 # Convert all values that aren't serializable to strings
@@ -124,38 +329,57 @@ class DataStorage:
                             clean_video[key] = str(value)
                     serializable_data.append(clean_video)
             
-                data_json = json.dumps(serializable_data, indent=2)
-            except TypeError as e:
-                logger.error(f"JSON serialization error: {str(e)}")
+                data_json = encode_snapshot(serializable_data, snapshot_format)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Serialization error: {str(e)}")
                 return None
             
-            # Upload the JSON string to the bucket
-            blob.upload_from_string(
-                data_json,
-                content_type="application/json"
-            )
-            
-            # Set metadata on the blob
-            blob.metadata = {
+            # Upload the snapshot together with its metadata
+            metadata = {
                 'uploaded_at': datetime.now().isoformat(),
                 'item_count': str(len(videos_data)) if isinstance(videos_data, list) else 'N/A',
-                'content_type': 'youtube_videos'
+                'content_type': 'youtube_videos',
+                'snapshot_format': snapshot_format
             }
-            blob.patch()
-            
-            # Explicitly check if the blob exists after upload
-            if blob.exists():
+            if self._upload_json(blob, data_json, metadata, if_generation_match, CONTENT_TYPES[snapshot_format]):
                 logger.info(f"Successfully saved {len(videos_data) if isinstance(videos_data, list) else '?'} videos to {blob_name}")
                 return blob_name
             else:
-                logger.error(f"Blob {blob_name} was not found after upload")
+                logger.error(f"Upload of {blob_name} was not confirmed")
                 return None
                 
         except Exception as e:
             logger.error(f"Error saving videos data: {str(e)}")
+            self._invalidate_bucket()
             # Instead of raising the exception, return None to indicate failure
             return None
 
+    def save_sketch_data(self, blob_name, sketch_data, if_generation_match=None):
+        """
+        Save a serialized summary (such as a tag sketch) to Cloud Storage
+        
+        Args:
+            blob_name: Name of the blob
+            sketch_data: JSON serializable dictionary
+            if_generation_match: Optional generation precondition, used for read-modify-write updates
+        
+        Returns:
+            Blob name of the saved data or None if failed (including a failed precondition)
+        """
+        try:
+            blob = self.bucket.blob(blob_name)
+            metadata = {
+                'uploaded_at': datetime.now().isoformat(),
+                'content_type': 'tag_sketch'
+            }
+            if self._upload_json(blob, json.dumps(sketch_data), metadata, if_generation_match):
+                return blob_name
+            return None
+        except Exception as e:
+            logger.error(f"Error saving sketch data: {str(e)}")
+            self._invalidate_bucket()
+            return None
+
     def _sanitize_for_json(self, data):
         """
         Sanitize data to ensure it's JSON serializable
@@ -176,13 +400,15 @@ class DataStorage:
             # Convert non-serializable objects to strings
             return str(data)
 
-    def save_comments_data(self, video_id, comments_data):
+    def save_comments_data(self, video_id, comments_data, if_generation_match=None, snapshot_format=None):
         """
         Save comments data to Cloud Storage
         
         Args:
             video_id: YouTube video ID
             comments_data: List of comment dictionaries to save
+            if_generation_match: Optional generation precondition, 0 makes retries idempotent
+            snapshot_format: 'json', 'ndjson' or 'columnar', defaults to STORAGE_SNAPSHOT_FORMAT
         
         Returns:
             Blob name of the saved data
@@ -192,49 +418,178 @@ class DataStorage:
             return None
             
         try:
-            # Generate blob name with video ID and timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            blob_name = f"comments_{video_id}_{timestamp}.json"
+            snapshot_format = snapshot_format or SNAPSHOT_FORMAT
+            
+            # Generate blob name with video ID, timestamp and a random suffix
+            blob_name = snapshot_name(unique_blob_base(f"comments_{video_id}"), snapshot_format)
             
             # Reference to the blob
             blob = self.bucket.blob(blob_name)
             
-            # Convert data to JSON with proper formatting
+            # Convert data to the snapshot format
             try:
-                data_json = json.dumps(comments_data, indent=2, default=str)
+                data_json = encode_snapshot(comments_data, snapshot_format)
             except TypeError as e:
-                logger.error(f"JSON serialization error: {str(e)}")
+                logger.error(f"Serialization error: {str(e)}")
                 # Try a more basic approach for serialization
-                data_json = json.dumps(self._sanitize_for_json(comments_data), indent=2)
-            
-            # Upload the JSON string to the bucket
-            blob.upload_from_string(
-                data_json, 
-                content_type="application/json"
-            )
+                data_json = encode_snapshot(self._sanitize_for_json(comments_data), snapshot_format)
             
-            # Set metadata on the blob
-            blob.metadata = {
+            # Upload the snapshot together with its metadata
+            metadata = {
                 'uploaded_at': datetime.now().isoformat(),
                 'video_id': video_id,
                 'comment_count': str(len(comments_data)),
-                'content_type': 'youtube_comments'
+                'content_type': 'youtube_comments',
+                'snapshot_format': snapshot_format
             }
-            blob.patch()
-            
-            # Verify upload was successful
-            if blob.exists():
+            if self._upload_json(blob, data_json, metadata, if_generation_match, CONTENT_TYPES[snapshot_format]):
                 logger.info(f"Successfully saved {len(comments_data)} comments for video {video_id} to {blob_name}")
                 return blob_name
             else:
-                logger.error(f"Blob {blob_name} was not found after upload")
+                logger.error(f"Upload of {blob_name} was not confirmed")
                 return None
                 
         except Exception as e:
             logger.error(f"Error saving comments data: {str(e)}")
+            self._invalidate_bucket()
             # Instead of raising the exception, return None to indicate failure
             return None
 
+    def get_blob(self, blob_name):
+        """
+        Fetch a blob's current properties (size, generation, encoding) in one request
+        
+        Args:
+            blob_name: Name of the blob
+            
+        Returns:
+            The Blob
+            
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        try:
+            with timed(self.service, 'get_blob'):
+                blob = self.bucket.get_blob(blob_name)
+        except Exception as e:
+            logger.error(f"Error getting {blob_name}: {str(e)}")
+            self._invalidate_bucket()
+            raise RuntimeError(f"Failed to get file: {str(e)}") from e
+        if blob is None:
+            raise FileNotFoundError(f"File {blob_name} not found in bucket {self.bucket_name}")
+        return blob
+
+    def iter_blob_bytes(self, blob, start=0, end=None, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Stream the stored bytes of a blob without decoding them
+        
+        Bytes are returned exactly as stored, so gzip-encoded objects stay
+        compressed. Every chunk is pinned to the blob's generation, so a
+        concurrent overwrite cannot mix two versions into one stream.
+        
+        Args:
+            blob: Blob from get_blob
+            start: First byte to return
+            end: Last byte to return (inclusive), defaults to the end of the blob
+            chunk_size: Bytes fetched per request
+            
+        Yields:
+            Chunks of bytes
+        """
+        if end is None:
+            end = blob.size - 1
+
+        cache = None if self.is_local else get_blob_cache()
+        path = cache.get(self.bucket_name, blob.name, blob.generation) if cache else None
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    remaining = end - start + 1
+                    while remaining > 0:
+                        chunk = f.read(min(chunk_size, remaining))
+                        if not chunk:
+                            break
+                        yield chunk
+                        remaining -= len(chunk)
+                return
+            except FileNotFoundError:
+                # Evicted before we opened it, fall back to the bucket
+                pass
+
+        position = start
+        while position <= end:
+            chunk_end = min(position + chunk_size - 1, end)
+            try:
+                with timed(self.service, 'download_range'):
+                    chunk = blob.download_as_bytes(
+                        start=position,
+                        end=chunk_end,
+                        raw_download=True,
+                        if_generation_match=blob.generation
+                    )
+            except Exception as e:
+                logger.error(f"Error streaming {blob.name} at byte {position}: {str(e)}")
+                raise RuntimeError(f"Failed to stream file: {str(e)}") from e
+            if not chunk:
+                break
+            yield chunk
+            position += len(chunk)
+
+    def _cache_blob(self, blob):
+        """
+        Make sure a blob version is in the local cache
+        
+        Args:
+            blob: Blob from get_blob
+            
+        Returns:
+            Path of the cached file, or None if it should not be cached
+        """
+        cache = None if self.is_local else get_blob_cache()
+        if cache is None or not blob.size or blob.size > cache.max_bytes // 4:
+            return None
+        path = cache.get(self.bucket_name, blob.name, blob.generation)
+        if path is None:
+            path = cache.put(self.bucket_name, blob.name, blob.generation, self.iter_blob_bytes(blob))
+        return path
+
+
+    @contextmanager
+    def open_blob_stream(self, blob_name):
+        """
+        Open a blob for incremental reading
+        
+        Blobs small enough for the local cache are read from the cached
+        copy, larger ones are streamed from the bucket chunk by chunk.
+        Gzip content is decompressed on the fly.
+        
+        Args:
+            blob_name: Name of the blob
+            
+        Yields:
+            A binary file-like object with the blob's decoded content
+        """
+        blob = self.get_blob(blob_name)
+        raw = None
+        path = self._cache_blob(blob)
+        if path:
+            try:
+                raw = open(path, 'rb')
+            except FileNotFoundError:
+                raw = None
+        if raw is None:
+            raw = io.BufferedReader(_ChunkStream(self.iter_blob_bytes(blob)), buffer_size=64 * 1024)
+        
+        try:
+            if raw.peek(2)[:2] == b'\x1f\x8b':
+                with gzip.GzipFile(fileobj=raw) as decompressed:
+                    yield decompressed
+            else:
+                yield raw
+        finally:
+            raw.close()
+
     def load_data(self, blob_name):
         """
         Load data from Cloud Storage
@@ -243,31 +598,128 @@ class DataStorage:
             blob_name: Name of the blob to load
             
         Returns:
-            Dictionary containing the loaded data
+            The loaded data, NDJSON and columnar snapshots come back as lists of records
         """
         if not blob_name:
             logger.warning("No blob name provided")
             return None
             
         try:
-            # Reference to the blob
-            blob = self.bucket.blob(blob_name)
-            
-            # Check if blob exists
-            if not blob.exists():
-                logger.warning(f"Blob {blob_name} does not exist")
-                raise FileNotFoundError(f"File {blob_name} not found in bucket {self.bucket_name}")
+            # One metadata request gives us existence and the current generation
+            blob = self.get_blob(blob_name)
+            
+            # Parse straight from a memory map of the local copy when we have one
+            path = self._cache_blob(blob)
+            if path:
+                try:
+                    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        return decode_snapshot(mapped, blob.name, blob.metadata)
+                except FileNotFoundError:
+                    logger.debug(f"Cached copy of {blob_name} was evicted, downloading")
             
             # Download and parse the JSON data
-            data_json = blob.download_as_string()
-            return json.loads(data_json)
+            with timed(self.service, 'download'):
+                data_json = blob.download_as_bytes(raw_download=True, if_generation_match=blob.generation)
+            return decode_snapshot(data_json, blob.name, blob.metadata)
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing JSON from {blob_name}: {str(e)}")
             raise ValueError(f"Invalid JSON in file {blob_name}") from e
         except Exception as e:
             logger.error(f"Error loading data from {blob_name}: {str(e)}")
+            if not isinstance(e, FileNotFoundError):
+                self._invalidate_bucket()
             raise RuntimeError(f"Failed to load data: {str(e)}") from e
             
+    def _blob_format(self, blob):
+        """Detect the snapshot format of a blob from its metadata or first bytes"""
+        metadata = blob.metadata or {}
+        if metadata.get('snapshot_format') in FORMATS or not blob.size:
+            return detect_format(b'', blob.name, metadata)
+        head = b''.join(self.iter_blob_bytes(blob, 0, min(blob.size, HEADER_READ_SIZE) - 1))
+        return detect_format(head, blob.name, metadata)
+
+    def _columnar_reader(self, blob):
+        """Open a columnar snapshot for ranged reads from the local cache or the bucket"""
+        self._cache_blob(blob)
+        return ColumnarReader(
+            lambda offset, length: b''.join(self.iter_blob_bytes(blob, offset, offset + length - 1)),
+            blob.size
+        )
+
+    def get_snapshot_format(self, blob_name):
+        """
+        Detect the format of a stored snapshot
+        
+        Args:
+            blob_name: Name of the blob
+            
+        Returns:
+            'json', 'ndjson' or 'columnar'
+        """
+        return self._blob_format(self.get_blob(blob_name))
+
+    def iter_records(self, blob_name, columns=None, start=0, stop=None):
+        """
+        Read the records of a stored snapshot, whatever its format
+        
+        Columnar snapshots only fetch and decode the selected columns and
+        the row groups covering the range. NDJSON and JSON snapshots are
+        parsed incrementally and reading stops at the end of the range.
+        
+        Args:
+            blob_name: Name of the blob
+            columns: Optional field names to keep, dotted names select nested fields
+            start: Index of the first record
+            stop: Index after the last record, None for the end
+            
+        Yields:
+            Record dictionaries
+        """
+        blob = self.get_blob(blob_name)
+        snapshot_format = self._blob_format(blob)
+        if snapshot_format == FORMAT_COLUMNAR:
+            yield from self._columnar_reader(blob).iter_records(columns, start, stop)
+            return
+
+        with self.open_blob_stream(blob_name) as stream:
+            if snapshot_format == FORMAT_NDJSON:
+                records = iter_ndjson_records(stream, start, stop)
+            elif stream.peek(HEADER_READ_SIZE).lstrip()[:1] == b'[':
+                records = itertools.islice(ijson.items(stream, 'item', use_float=True), start, stop)
+            else:
+                # A single JSON document is one record
+                records = itertools.islice([json.load(stream)], start, stop)
+            for record in records:
+                yield project_record(record, columns)
+
+    def read_columns(self, blob_name, columns, start=0, stop=None):
+        """
+        Read selected fields of a stored snapshot as columns
+        
+        Args:
+            blob_name: Name of the blob
+            columns: Field names, dotted names select nested fields ("sentiment.score")
+            start: Index of the first record
+            stop: Index after the last record, None for the end
+            
+        Returns:
+            Dictionary mapping field names to values. Columnar snapshots
+            return NumPy arrays for numeric fields, everything else comes
+            back as lists with None for missing values.
+        """
+        blob = self.get_blob(blob_name)
+        if self._blob_format(blob) == FORMAT_COLUMNAR:
+            return self._columnar_reader(blob).read_columns(columns, start, stop)
+
+        result = {column: [] for column in columns}
+        for record in self.iter_records(blob_name, columns, start, stop):
+            for column in columns:
+                value = record
+                for key in column.split('.'):
+                    value = value.get(key) if isinstance(value, dict) else None
+                result[column].append(value)
+        return result
+
     def list_blobs(self, prefix=None, max_results=None):
         """
         List all blobs in the bucket
@@ -281,12 +733,89 @@ class DataStorage:
         """
         try:
             # List blobs with optional filters
-            blobs = self.bucket.list_blobs(prefix=prefix, max_results=max_results)
-            return [blob.name for blob in blobs]
+            with timed(self.service, 'list'):
+                blobs = self.bucket.list_blobs(prefix=prefix, max_results=max_results)
+                return [blob.name for blob in blobs]
         except Exception as e:
             logger.error(f"Error listing blobs: {str(e)}")
+            self._invalidate_bucket()
             raise RuntimeError(f"Failed to list files: {str(e)}") from e
     
+    def refresh_index(self):
+        """
+        Sync the local blob index with the bucket
+        
+        Lists only the fields the index needs, and only rewrites index
+        rows for blobs that were added or changed since the last sync.
+        
+        Returns:
+            Number of added or updated index rows
+        """
+        index = get_blob_index()
+        if index is None:
+            return 0
+        try:
+            # The listing is paged lazily while the index consumes it, so the sync is timed with it
+            with timed(self.service, 'list_index'):
+                blobs = self.bucket.list_blobs(fields='items(name,size,generation,updated,metadata),nextPageToken')
+                return index.sync(self.bucket_name, blobs)
+        except Exception as e:
+            logger.error(f"Error refreshing blob index: {str(e)}")
+            self._invalidate_bucket()
+            raise RuntimeError(f"Failed to list files: {str(e)}") from e
+
+    def _refresh_index_in_background(self):
+        """Refresh the index on a background thread unless one is already running"""
+        with _refreshing_lock:
+            if self.bucket_name in _refreshing:
+                return
+            _refreshing.add(self.bucket_name)
+
+        def run():
+            try:
+                self.refresh_index()
+            except Exception:
+                pass
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(self.bucket_name)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def query_blobs(self, prefix=None, blob_type=None, page=1, per_page=50):
+        """
+        Page through the files in the bucket using the local index
+        
+        The first query for a bucket syncs the index before answering.
+        Later queries are answered from the index straight away, and an
+        index older than BLOB_INDEX_REFRESH_SECONDS is refreshed in the background.
+        
+        Args:
+            prefix: Optional name prefix filter
+            blob_type: Optional type filter ('videos', 'comments' or 'data')
+            page: 1-based page number
+            per_page: Files per page
+            
+        Returns:
+            Tuple of (list of file dictionaries with name, size, generation, type, video_id and timestamp, total matching files)
+        """
+        offset = (max(page, 1) - 1) * per_page
+        index = get_blob_index()
+        if index is None:
+            # No index available, fall back to listing the bucket
+            names = self.list_blobs(prefix=prefix)
+            files = [{'name': name, 'size': None, 'generation': None, 'type': None, 'video_id': None, 'timestamp': None}
+                     for name in sorted(names, reverse=True)]
+            return files[offset:offset + per_page], len(files)
+
+        refreshed_at = index.refreshed_at(self.bucket_name)
+        if refreshed_at is None:
+            self.refresh_index()
+        elif time.time() - refreshed_at > INDEX_REFRESH_SECONDS:
+            self._refresh_index_in_background()
+        return index.query(self.bucket_name, prefix=prefix, blob_type=blob_type,
+                           offset=offset, limit=per_page)
+
     def get_blob_metadata(self, blob_name):
         """
         Get metadata for a specific blob
@@ -299,7 +828,8 @@ class DataStorage:
         """
         try:
             blob = self.bucket.blob(blob_name)
-            blob.reload()  # Ensure we have the latest metadata
+            with timed(self.service, 'reload'):
+                blob.reload()  # Ensure we have the latest metadata
             
             # Combine standard and custom metadata
             metadata = {
@@ -313,6 +843,7 @@ class DataStorage:
             return metadata
         except Exception as e:
             logger.error(f"Error getting metadata for {blob_name}: {str(e)}")
+            self._invalidate_bucket()
             raise RuntimeError(f"Failed to get metadata: {str(e)}") from e
     
     def delete_blob(self, blob_name):
@@ -327,9 +858,14 @@ class DataStorage:
         """
         try:
             blob = self.bucket.blob(blob_name)
-            blob.delete()
+            with timed(self.service, 'delete'):
+                blob.delete()
+            index = get_blob_index()
+            if index is not None:
+                index.remove(self.bucket_name, blob_name)
             logger.info(f"Successfully deleted {blob_name}")
             return True
         except Exception as e:
             logger.error(f"Error deleting {blob_name}: {str(e)}")
+            self._invalidate_bucket()
             raise RuntimeError(f"Failed to delete file: {str(e)}") from e
\ No newline at end of file
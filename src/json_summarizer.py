@@ -0,0 +1,271 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   json_summarizer.py
+#       Builds the /summarize_json summary from a byte stream
+#       with an incremental JSON parser, so memory stays fixed
+#       no matter how large the stored file is
+# ╚═══════════════════════════════════════════════════════════╝
+
+import logging
+import random
+import ijson
+
+logger = logging.getLogger(__name__)
+
+# ijson event name -> type name shown in the summary
+_EVENT_TYPES = {
+    'start_map': 'dict',
+    'start_array': 'list',
+    'string': 'str',
+    'integer': 'int',
+    'double': 'float',
+    'number': 'float',
+    'boolean': 'bool',
+    'null': 'null',
+}
+
+class _Summary:
+    """Running statistics for one JSON document"""
+
+    def __init__(self, sample_size, rng):
+        self.data_type = None
+        self.item_count = 0
+        self.key_stats = {}
+        self.first_item = None
+        self.reservoir = []
+        self.sample_size = sample_size
+        self.rng = rng
+        self.scalar = None
+
+    def wants_sample(self):
+        """Decide, when an item starts, whether it goes into the reservoir (Algorithm R)"""
+        if self.item_count < self.sample_size:
+            return len(self.reservoir)
+        slot = self.rng.randrange(self.item_count + 1)
+        return slot if slot < self.sample_size else None
+
+    def add_sample(self, slot, item):
+        if slot >= len(self.reservoir):
+            self.reservoir.append(item)
+        else:
+            self.reservoir[slot] = item
+
+    def record_key(self, key, value_type):
+        stats = self.key_stats.get(key)
+        if stats is None:
+            stats = self.key_stats[key] = {'present': 0, 'nulls': 0, 'types': {}}
+        stats['present'] += 1
+        if value_type == 'null':
+            stats['nulls'] += 1
+        stats['types'][value_type] = stats['types'].get(value_type, 0) + 1
+
+    def snapshot(self, partial):
+        """Return the summary dictionary rendered by json_summary.html"""
+        if self.data_type == 'List':
+            keys = list(self.key_stats) if self.key_stats else "Not dictionaries or empty list"
+            sample = self.first_item if self.item_count else "Empty list"
+            item_count = self.item_count
+        elif self.data_type == 'Dictionary':
+            keys = list(self.key_stats)
+            sample = dict(self.reservoir) if self.reservoir else "Empty dictionary"
+            item_count = 1
+        elif self.data_type is None:
+            keys, sample, item_count = "No data found", "No data available", 0
+        else:
+            text = str(self.scalar)
+            keys = "Not a list or dictionary"
+            sample = text[:200] + "..." if len(text) > 200 else text
+            item_count = "Not applicable"
+
+        return {
+            'data_type': self.data_type or 'None',
+            'item_count': item_count,
+            'keys': keys,
+            'sample': sample,
+            'key_stats': {k: {'present': v['present'], 'nulls': v['nulls'], 'types': dict(v['types'])}
+                          for k, v in self.key_stats.items()},
+            'samples': list(self.reservoir) if self.data_type == 'List' else [],
+            'partial': partial
+        }
+
+def iter_json_summaries(stream, sample_size=5, report_every=1000, max_items=None, seed=None):
+    """
+    Summarize a JSON document while it is being read
+
+    For a top-level list, counts the items, collects the union of keys of
+    dictionary items with per-key type and null counts, keeps the first
+    item and a uniform reservoir sample of sample_size items. For a
+    top-level dictionary, lists its keys with the type of each value and
+    keeps the first five entries. Only sampled items are ever built in
+    memory.
+
+    Args:
+        stream: Binary file-like object with the JSON text
+        sample_size: Number of list items kept in the reservoir
+        report_every: Yield an intermediate summary every this many list items
+        max_items: Stop after this many list items and mark the summary partial
+        seed: Optional random seed for the reservoir
+
+    Yields:
+        Summary dictionaries, the last one covering everything that was read
+    """
+    summary = _Summary(sample_size, random.Random(seed))
+    events = ijson.parse(stream, use_float=True)
+
+    try:
+        _, event, value = next(events)
+    except StopIteration:
+        yield summary.snapshot(partial=False)
+        return
+
+    if event == 'start_array':
+        summary.data_type = 'List'
+        yield from _summarize_list(events, summary, report_every, max_items)
+    elif event == 'start_map':
+        summary.data_type = 'Dictionary'
+        _summarize_dict(events, summary)
+        yield summary.snapshot(partial=False)
+    else:
+        summary.data_type = _event_type(event, value)
+        summary.scalar = value
+        yield summary.snapshot(partial=False)
+
+def iter_record_summaries(records, sample_size=5, report_every=1000, max_items=None, seed=None):
+    """
+    Summarize a sequence of records, such as an NDJSON or columnar snapshot
+
+    Produces the same summaries as iter_json_summaries does for a
+    top-level list.
+
+    Args:
+        records: Iterable of already decoded records
+        sample_size: Number of records kept in the reservoir
+        report_every: Yield an intermediate summary every this many records
+        max_items: Stop after this many records and mark the summary partial
+        seed: Optional random seed for the reservoir
+
+    Yields:
+        Summary dictionaries, the last one covering everything that was read
+    """
+    summary = _Summary(sample_size, random.Random(seed))
+    summary.data_type = 'List'
+    for record in records:
+        if summary.item_count == 0:
+            summary.first_item = record
+        slot = summary.wants_sample()
+        if slot is not None:
+            summary.add_sample(slot, record)
+        if isinstance(record, dict):
+            for key, field in record.items():
+                summary.record_key(key, _python_type(field))
+
+        summary.item_count += 1
+        if max_items is not None and summary.item_count >= max_items:
+            yield summary.snapshot(partial=True)
+            return
+        if report_every and summary.item_count % report_every == 0:
+            yield summary.snapshot(partial=True)
+
+    yield summary.snapshot(partial=False)
+
+def _build_value(event, value, events):
+    """Build the full Python value that starts with the given event"""
+    if event not in ('start_map', 'start_array'):
+        return value
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    depth = 1
+    for _, event, value in events:
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                break
+    return builder.value
+
+def _skip_value(event, events):
+    """Consume the events of a value without building it"""
+    if event not in ('start_map', 'start_array'):
+        return
+    depth = 1
+    for _, event, _ in events:
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                return
+
+def _summarize_list(events, summary, report_every, max_items):
+    for _, event, value in events:
+        if event == 'end_array':
+            break
+
+        slot = summary.wants_sample()
+        keep_first = summary.item_count == 0
+        if slot is not None or keep_first:
+            item = _build_value(event, value, events)
+            if isinstance(item, dict):
+                for key, field in item.items():
+                    summary.record_key(key, _python_type(field))
+            if slot is not None:
+                summary.add_sample(slot, item)
+            if keep_first:
+                summary.first_item = item
+        elif event == 'start_map':
+            # Only look at the item's own keys and the type of each value
+            for _, event, value in events:
+                if event == 'end_map':
+                    break
+                key = value
+                _, event, value = next(events)
+                summary.record_key(key, _event_type(event, value))
+                _skip_value(event, events)
+        else:
+            _skip_value(event, events)
+
+        summary.item_count += 1
+        if max_items is not None and summary.item_count >= max_items:
+            yield summary.snapshot(partial=True)
+            return
+        if report_every and summary.item_count % report_every == 0:
+            yield summary.snapshot(partial=True)
+
+    yield summary.snapshot(partial=False)
+
+def _summarize_dict(events, summary):
+    for _, event, value in events:
+        if event == 'end_map':
+            break
+        key = value
+        _, event, value = next(events)
+        summary.record_key(key, _event_type(event, value))
+        if len(summary.reservoir) < 5:
+            summary.reservoir.append((key, _build_value(event, value, events)))
+        else:
+            _skip_value(event, events)
+
+def _event_type(event, value):
+    """Type name for the value starting with an ijson event"""
+    if event == 'number':
+        return 'int' if isinstance(value, int) else 'float'
+    return _EVENT_TYPES.get(event, event)
+
+def _python_type(value):
+    """Type name of an already built value, matching _EVENT_TYPES"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    if isinstance(value, dict):
+        return 'dict'
+    if isinstance(value, list):
+        return 'list'
+    return type(value).__name__
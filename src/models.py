@@ -5,6 +5,8 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from src.utils.cache import TTLCache
+import os
 
 db = SQLAlchemy()
 
@@ -13,3 +15,38 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='user')  # 'admin' or 'user'
+
+
+class CachedUser(UserMixin):
+    """Detached copy of a User with the fields requests need, safe to share between threads"""
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+
+# Users seen by the login manager, so authenticated requests skip the database
+_user_cache = TTLCache(
+    ttl=int(os.environ.get('USER_CACHE_TTL', 300)),
+    max_size=int(os.environ.get('USER_CACHE_SIZE', 1024)),
+    name='user cache'
+)
+
+def load_cached_user(user_id):
+    """
+    Return the user for a session, from the cache when possible
+
+    Args:
+        user_id: User id stored by Flask-Login
+
+    Returns:
+        A CachedUser, or None if the user does not exist
+    """
+    def load():
+        user = db.session.get(User, user_id)
+        return CachedUser(user) if user is not None else None
+    return _user_cache.get_or_load(user_id, load, should_cache=lambda user: user is not None)
+
+def invalidate_user_cache(user_id=None):
+    """Forget one cached user, or all of them after users were created or changed"""
+    _user_cache.invalidate(user_id)
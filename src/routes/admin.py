@@ -2,13 +2,17 @@
 #   admin routes
 #       This file routes all traffic from the following routes:
 #       - /config
+#       - /metrics
 # ╚═══════════════════════════════════════════════════════════╝
 
-from flask import Blueprint, request, render_template, redirect, url_for, session, flash
+from flask import Blueprint, request, render_template, redirect, url_for, session, flash, Response
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
-from src.models import User, db
+from src.models import User, db, invalidate_user_cache
 from src.utils.decorators import admin_required
+from src.storage_backends import is_local_bucket, local_bucket_path
+from src.utils.metrics import REGISTRY
+import hmac
 import os
 
 admin_bp = Blueprint('admin', __name__)
@@ -33,13 +37,19 @@ def config():
                 )
                 db.session.add(new_user)
                 db.session.commit()
+                invalidate_user_cache()
                 flash('User created successfully')
         
         if 'update_bucket' in request.form:
             new_bucket_name = request.form.get('bucket_name')
             if new_bucket_name:
-                session['storage_bucket'] = new_bucket_name
-                flash('Storage bucket updated successfully')
+                try:
+                    if is_local_bucket(new_bucket_name):
+                        local_bucket_path(new_bucket_name)
+                    session['storage_bucket'] = new_bucket_name
+                    flash('Storage bucket updated successfully')
+                except ValueError as e:
+                    flash(str(e))
         # Add new condition for updating YouTube API key
         if 'update_api_key' in request.form:
             new_api_key = request.form.get('api_key')
@@ -63,3 +73,13 @@ def config():
                          current_bucket=current_bucket,
                          current_api_key=current_api_key,
                          users=users)
+
+@admin_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for admins, or for scrapers sending the METRICS_TOKEN bearer token"""
+    token = os.environ.get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())):
+        if not current_user.is_authenticated or current_user.role != 'admin':
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
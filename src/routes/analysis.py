@@ -1,45 +1,96 @@
 # src/routes/analysis.py
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, session
 from flask_login import login_required
 from ..youtube_stats import YouTubeStats
+from ..data_storage import DataStorage
+from ..tag_index import WINDOWS, approx_top_tags, get_tag_index, refresh_tag_index, sketch_months, window_days
+import heapq
 import logging
 
 logger = logging.getLogger(__name__)
 analysis_bp = Blueprint('analysis', __name__)
 
+def _live_top_tags(k=20):
+    """Top tags of the current privacy search results, counted on the fly"""
+    youtube_stats = YouTubeStats(session.get('youtube_api_key'))
+    videos = youtube_stats.search_privacy_videos(max_results=20)
+    
+    if isinstance(videos, dict) and 'error' in videos:
+        raise RuntimeError(videos['error'])
+        
+    # Create a tag frequency dictionary
+    tag_frequency = {}
+    valid_videos = 0
+    
+    for video in videos:
+        # Check if tags exist in the video data
+        if 'tags' in video and video['tags']:
+            valid_videos += 1
+            for tag in video['tags']:
+                if tag:  # Make sure tag is not empty
+                    tag = tag.lower().strip()  # Normalize tags
+                    tag_frequency[tag] = tag_frequency.get(tag, 0) + 1
+            
+    # Get top tags with a heap instead of sorting every tag
+    top_tags = heapq.nlargest(k, tag_frequency.items(), key=lambda x: x[1])
+    return top_tags, valid_videos
+
 @analysis_bp.route('/tag_analysis')
 @login_required
 def tag_analysis():
+    source = request.args.get('source', 'index')
+    window = request.args.get('window', 'all')
+    mode = request.args.get('mode', 'exact')
+    snapshot_count = 0
+    error_bound = None
+    months = []
     try:
-        youtube_stats = YouTubeStats()
-        videos = youtube_stats.search_privacy_videos(max_results=20)
-        
-        if isinstance(videos, dict) and 'error' in videos:
-            return render_template('tag_analysis.html', error=videos['error'], tags=[], total_videos=0)
-            
-        # Create a tag frequency dictionary
-        tag_frequency = {}
-        valid_videos = 0
-        
-        for video in videos:
-            # Check if tags exist in the video data
-            if 'tags' in video and video['tags']:
-                valid_videos += 1
-                for tag in video['tags']:
-                    if tag:  # Make sure tag is not empty
-                        tag = tag.lower().strip()  # Normalize tags
-                        tag_frequency[tag] = tag_frequency.get(tag, 0) + 1
-                
-        # Sort tags by frequency
-        sorted_tags = sorted(tag_frequency.items(), key=lambda x: x[1], reverse=True)
-        
-        # Get top 20 tags
-        top_tags = sorted_tags[:20]
+        window_days(window)
+    except ValueError:
+        window = 'all'
+
+    try:
+        top_tags = None
+        if source == 'index':
+            index = get_tag_index()
+            try:
+                data_storage = DataStorage(session.get('storage_bucket', 'itc-388-youtube-r6'))
+                if mode == 'approx':
+                    # Bounded-memory estimates from the Space-Saving sketches stored in the bucket
+                    top_tags, valid_videos, snapshot_count, error_bound = approx_top_tags(data_storage, 20, window)
+                    months = sketch_months(data_storage)
+                elif index is not None:
+                    # Counts from every stored snapshot, kept up to date incrementally
+                    refresh_tag_index(data_storage, index)
+                    top_tags, valid_videos, snapshot_count = index.top_tags(data_storage.bucket_name, 20, window)
+                    months = index.months(data_storage.bucket_name)
+            except Exception as e:
+                logger.error(f"Error reading stored tag counts: {str(e)}")
+            if not months:
+                # No stored snapshots yet, fall back to the live search, which
+                # gives exact counts with no sketch error bound
+                source = 'live'
+                mode = 'exact'
+                error_bound = None
+                snapshot_count = 0
+                top_tags = None
+
+        if top_tags is None:
+            top_tags, valid_videos = _live_top_tags(20)
         
         return render_template('tag_analysis.html', 
                              tags=top_tags,
                              total_videos=valid_videos,
+                             source=source,
+                             window=window,
+                             mode=mode,
+                             error_bound=error_bound,
+                             windows=WINDOWS,
+                             months=months,
+                             snapshot_count=snapshot_count,
                              error=None)
+    except RuntimeError as e:
+        return render_template('tag_analysis.html', error=str(e), tags=[], total_videos=0)
     except Exception as e:
         logger.error(f"Error in tag analysis route: {str(e)}")
         return render_template('tag_analysis.html', 
@@ -51,4 +102,4 @@ def tag_analysis():
 @analysis_bp.route('/more', methods=['GET'])
 @login_required
 def more():
-    return render_template('more.html')
\ No newline at end of file
+    return render_template('more.html')
@@ -1,8 +1,9 @@
 # src/routes/auth.py
-from flask import Blueprint, request, render_template, redirect, url_for
+from flask import Blueprint, request, render_template, redirect, url_for, session
 from flask_login import login_user, logout_user, login_required
 from werkzeug.security import check_password_hash
 from src.models import User  # Changed from relative to absolute import
+from src.session_store import rotate_session_id
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -14,6 +15,8 @@ def login():
         user = User.query.filter_by(username=username).first()
         if user and check_password_hash(user.password, password):
             login_user(user)
+            # New session id on login, so a pre-login id cannot be fixated
+            rotate_session_id(session)
             return redirect(url_for('main.homepage')) 
         return render_template('login.html', error="Invalid username or password")
     return render_template('login.html')
@@ -1,18 +1,22 @@
 from flask import Blueprint, render_template, request, session
 from flask_login import login_required
 from ..youtube_stats import YouTubeStats
-from ..sentiment_analyzer import SentimentAnalyzer, LocalSentimentAnalyzer
-from ..data_storage import DataStorage
+from ..sentiment_analyzer import SentimentAnalyzer, create_local_analyzer
+from ..sentiment_pipeline import analyze_comments, save_comments_in_background
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 sentiment_bp = Blueprint('sentiment', __name__)
 
+# Maximum number of comments harvested and analyzed per video
+MAX_SENTIMENT_COMMENTS = int(os.environ.get('SENTIMENT_MAX_COMMENTS', 500))
+
 @sentiment_bp.route('/sentiment', methods=['GET'])
 @login_required
 def sentiment_analysis():
     try:
-        youtube_stats = YouTubeStats()
+        youtube_stats = YouTubeStats(session.get('youtube_api_key'))
         videos = youtube_stats.search_privacy_videos(max_results=20)
         
         if isinstance(videos, dict) and 'error' in videos:
@@ -37,14 +41,26 @@ def sentiment_analysis():
 
             if selected_video:
                 total_comment_count = int(selected_video.get('comments', '0'))
-                if total_comment_count > 50:
+                if total_comment_count > MAX_SENTIMENT_COMMENTS:
                     comments_limited = True
 
-                comments_data = youtube_stats.get_video_comments(selected_video_id, max_results=50)
+                use_google_api = session.get('use_google_api', True)
 
-                if isinstance(comments_data, dict) and 'error' in comments_data:
+                try:
+                    sentiment_analyzer = SentimentAnalyzer() if use_google_api else create_local_analyzer()
+                except Exception as e:
+                    logger.error(f"Error initializing sentiment analyzer: {str(e)}")
+                    sentiment_analyzer = create_local_analyzer()
+                    use_google_api = False
+                    session['use_google_api'] = False
+
+                # Comment pages are scored while the next page is fetched
+                try:
+                    comments_data = analyze_comments(youtube_stats, selected_video_id, sentiment_analyzer,
+                                                     MAX_SENTIMENT_COMMENTS)
+                except RuntimeError as e:
                     return render_template('sentiment.html',
-                                           error=comments_data['error'],
+                                           error=str(e),
                                            videos=videos,
                                            comments=[],
                                            selected_video=selected_video,
@@ -53,27 +69,12 @@ def sentiment_analysis():
                                            comments_limited=comments_limited,
                                            use_google_api=session.get('use_google_api', True))
 
-                use_google_api = session.get('use_google_api', True)
-
-                try:
-                    sentiment_analyzer = SentimentAnalyzer() if use_google_api else LocalSentimentAnalyzer()
-                except Exception as e:
-                    logger.error(f"Error initializing sentiment analyzer: {str(e)}")
-                    sentiment_analyzer = LocalSentimentAnalyzer()
-                    use_google_api = False
-                    session['use_google_api'] = False
-
-                for comment in comments_data:
-                    if not comment['text']:
-                        continue
-                    sentiment = sentiment_analyzer.analyze_text(comment['text'])
-                    comment['sentiment'] = sentiment
-
+                # Saving to Cloud Storage happens in the background, off the response path
                 try:
-                    storage = DataStorage('data_privacy_analysis')
-                    storage.save_comments_data(selected_video_id, comments_data)
+                    if comments_data:
+                        save_comments_in_background(selected_video_id, comments_data)
                 except Exception as e:
-                    logger.error(f"Error saving to Cloud Storage: {str(e)}")
+                    logger.error(f"Error queueing comments save: {str(e)}")
 
                 total_comments = len(comments_data)
                 positive_count = sum(1 for comment in comments_data if comment.get('sentiment', {}).get('category') == 'positive')
@@ -104,6 +105,7 @@ def sentiment_analysis():
                                sentiment_stats=sentiment_stats,
                                error=None,
                                comments_limited=comments_limited,
+                               comment_limit=MAX_SENTIMENT_COMMENTS,
                                use_google_api=session.get('use_google_api', True))
 
     except Exception as e:
@@ -1,35 +1,139 @@
 # Enhanced version of storage.py route for uploading data
 
-from flask import Blueprint, render_template, request, session, flash, jsonify, redirect, url_for, send_file
+from flask import Blueprint, render_template, request, session, flash, jsonify, redirect, url_for, Response
 from flask_login import login_required
-from ..data_storage import DataStorage
+from ..data_storage import DataStorage, SNAPSHOT_FORMAT, unique_blob_base
 from ..youtube_stats import YouTubeStats
+from ..json_summarizer import iter_json_summaries, iter_record_summaries
+from ..snapshot_format import FORMAT_JSON, snapshot_name
+from ..utils.jobs import get_job_queue
+from ..tag_index import get_tag_index
+from ..storage_backends import is_local_bucket
 from datetime import datetime
+import hashlib
 import logging
-import json
-import io
 import os
 
 logger = logging.getLogger(__name__)
 storage_bp = Blueprint('storage', __name__)
 
+# Files shown per page on the storage manager
+FILES_PER_PAGE = int(os.environ.get('STORAGE_FILES_PER_PAGE', 50))
+
+# Items read before answering a preview request on /summarize_json
+SUMMARY_PREVIEW_ITEMS = int(os.environ.get('SUMMARY_PREVIEW_ITEMS', 1000))
+
+def _stream_blob_response(data_storage, blob_name):
+    """
+    Build a streaming download response for a blob
+
+    The stored bytes are piped to the client chunk by chunk without being
+    parsed, honouring HTTP Range requests and passing gzip encoding through.
+
+    Args:
+        data_storage: DataStorage holding the blob
+        blob_name: Name of the blob to download
+
+    Returns:
+        A Flask Response
+    """
+    blob = data_storage.get_blob(blob_name)
+    size = blob.size or 0
+    status = 200
+    start, end = 0, size - 1
+
+    if request.range:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            return Response(status=416, headers={'Content-Range': f"bytes */{size}"})
+        start, end = byte_range[0], byte_range[1] - 1
+        status = 206
+
+    response = Response(
+        data_storage.iter_blob_bytes(blob, start, end) if size else iter(()),
+        status=status,
+        mimetype=blob.content_type or 'application/json',
+        direct_passthrough=True
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(blob_name))
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Content-Length'] = str(end - start + 1 if size else 0)
+    if blob.etag:
+        response.set_etag(blob.etag)
+    if blob.content_encoding:
+        response.headers['Content-Encoding'] = blob.content_encoding
+    if status == 206:
+        response.headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+    return response
+
+def _wants_json():
+    """True when the client (the upload script) asked for a JSON response"""
+    return request.accept_mimetypes.best == 'application/json'
+
+def _upload_privacy_videos(job, bucket_name, api_key):
+    """Background job: fetch the current privacy videos and save them as a snapshot"""
+    job.update(10, "Fetching privacy videos from the YouTube API")
+    youtube_stats = YouTubeStats(api_key)
+    current_videos = youtube_stats.search_privacy_videos(max_results=20)
+    
+    if isinstance(current_videos, dict) and 'error' in current_videos:
+        raise RuntimeError(f"YouTube API error: {current_videos['error']}")
+    if not current_videos or not isinstance(current_videos, list):
+        raise RuntimeError("No data retrieved from YouTube API")
+    logger.info(f"Retrieved {len(current_videos)} videos from YouTube API")
+    
+    # Create a unique, timestamped blob name
+    blob_name = snapshot_name(unique_blob_base("privacy_videos", "%Y%m%d%H%M%S"), SNAPSHOT_FORMAT)
+    
+    job.update(60, f"Saving {len(current_videos)} videos to {bucket_name}")
+    data_storage = DataStorage(bucket_name)
+    saved_filename = data_storage.save_videos_data(current_videos, blob_name, if_generation_match=0)
+    if not saved_filename:
+        raise RuntimeError("Upload failed. No filename was returned.")
+    logger.info(f"Successfully saved data to {saved_filename}")
+    
+    # Merge the new snapshot into the tag index while we still have it in memory
+    job.update(90, "Updating the tag index")
+    index = get_tag_index()
+    if index is not None:
+        try:
+            index.add_snapshot(bucket_name, saved_filename, None, datetime.now().isoformat(),
+                               [video.get('tags') for video in current_videos])
+        except Exception as e:
+            logger.error(f"Error updating tag index: {str(e)}")
+    return saved_filename
+
+def _submit_upload_job(bucket_name, api_key):
+    """Queue an upload, reusing the job already in flight for the same bucket and API key"""
+    key_hash = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+    return get_job_queue().submit(
+        ('upload_privacy_videos', bucket_name, key_hash),
+        f"Upload privacy videos to {bucket_name}",
+        _upload_privacy_videos, bucket_name, api_key
+    )
+
 @storage_bp.route('/storage_manager', methods=['GET', 'POST'])
 @login_required
 def storage_manager():
     try:
         # Get bucket name from session or use default
         bucket_name = session.get('storage_bucket', 'itc-388-youtube-r6')
-        latest_upload = None
         upload_error = None
         files = []
+        total_files = 0
+        latest_upload = request.args.get('latest')
+        page = max(request.args.get('page', 1, type=int), 1)
+        prefix = request.args.get('q') or None
+        file_type = request.args.get('type') or None
 
         # Initialize DataStorage
         logger.info(f"Initializing DataStorage with bucket: {bucket_name}")
         try:
             data_storage = DataStorage(bucket_name)
             logger.info("DataStorage initialized successfully")
-            files = data_storage.list_blobs()
-            logger.info(f"Retrieved {len(files)} files from bucket")
+            file_rows, total_files = data_storage.query_blobs(prefix, file_type, page, FILES_PER_PAGE)
+            files = [row['name'] for row in file_rows]
+            logger.info(f"Retrieved {len(files)} of {total_files} files from the blob index")
         except Exception as storage_error:
             logger.error(f"Error connecting to Google Cloud Storage: {str(storage_error)}")
             upload_error = f"Could not connect to Google Cloud Storage: {str(storage_error)}"
@@ -39,80 +143,37 @@ def storage_manager():
             
             if 'upload' in request.form and not upload_error:
                 logger.info("Upload operation requested")
-                try:
-                    # Get fresh data from YouTube API
-                    logger.info("Initializing YouTubeStats")
-                    youtube_stats = YouTubeStats()
-                    logger.info("Fetching privacy videos from YouTube API")
-                    current_videos = youtube_stats.search_privacy_videos(max_results=20)
-                    
-                    # Add detailed debugging for the response
-                    if current_videos:
-                        logger.info(f"Type of current_videos: {type(current_videos)}")
-                        if isinstance(current_videos, list):
-                            logger.info(f"Number of videos retrieved: {len(current_videos)}")
-                            if current_videos:
-                                logger.info(f"First video keys: {list(current_videos[0].keys())}")
-                        elif isinstance(current_videos, dict):
-                            logger.info(f"Dictionary keys: {list(current_videos.keys())}")
-                            if 'error' in current_videos:
-                                logger.error(f"YouTube API error: {current_videos['error']}")
-                                flash(f"YouTube API error: {current_videos['error']}", 'danger')
-                    else:
-                        logger.warning("current_videos is None or empty")
-                    
-                    # Now attempt to process and save the data
-                    if current_videos and isinstance(current_videos, list) and not ('error' in current_videos if isinstance(current_videos, dict) else False):
-                        logger.info(f"Retrieved {len(current_videos)} videos from YouTube API")
-                        
-                        # Create a timestamp and blob name
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                        blob_name = f"privacy_videos_{timestamp}.json"
-                        
-                        # Save to Google Cloud Storage
-                        logger.info(f"Attempting to save videos data to {blob_name}")
-                        saved_filename = data_storage.save_videos_data(current_videos, blob_name)
-                        
-                        if saved_filename:
-                            logger.info(f"Successfully saved data to {saved_filename}")
-                            flash(f'Data successfully uploaded as {saved_filename}!', 'success')
-                            latest_upload = saved_filename
-                            
-                            # Refresh the file list after upload
-                            logger.info("Refreshing file list")
-                            files = data_storage.list_blobs()
-                            logger.info(f"File list refreshed, found {len(files)} files")
-                        else:
-                            logger.error("Upload failed. No filename was returned.")
-                            flash('Upload failed. No filename was returned.', 'danger')
-                    else:
-                        logger.warning("No videos retrieved from YouTube API or received error")
-                        flash('No data retrieved from YouTube API or received error', 'warning')
-                except Exception as e:
-                    logger.error(f"Error during upload process: {str(e)}", exc_info=True)
-                    flash(f"Upload failed: {str(e)}", 'danger')
+                job, queued = _submit_upload_job(bucket_name, session.get('youtube_api_key'))
+                if _wants_json():
+                    return jsonify({
+                        'job_id': job.id,
+                        'queued': queued,
+                        'status_url': url_for('storage.job_status', job_id=job.id),
+                        **job.to_dict()
+                    }), 202
+                flash(f"Upload started in the background (job {job.id}). Refresh to see the new file." if queued
+                      else f"An identical upload is already running (job {job.id}).", 'info')
+                return redirect(url_for('storage.storage_manager'))
+            
+            elif 'upload' in request.form and _wants_json():
+                return jsonify({'error': upload_error}), 503
             
             elif 'download' in request.form:
                 blob_name = request.form.get('blob_name')
                 if blob_name:
                     try:
-                        data = data_storage.load_data(blob_name)
-                        # Create a downloadable file
-                        json_data = json.dumps(data, indent=2)
-                        buffer = io.BytesIO(json_data.encode('utf-8'))
-                        buffer.seek(0)
-                        return send_file(
-                            buffer,
-                            mimetype='application/json',
-                            as_attachment=True,
-                            download_name=blob_name
-                        )
+                        return _stream_blob_response(data_storage, blob_name)
                     except Exception as e:
                         logger.error(f"Error downloading file: {str(e)}")
                         flash(f"Error downloading file: {str(e)}", 'danger')
         
         return render_template('storage_manager.html', 
                               files=files, 
+                              total_files=total_files,
+                              page=page,
+                              total_pages=max((total_files + FILES_PER_PAGE - 1) // FILES_PER_PAGE, 1),
+                              prefix=prefix or '',
+                              file_type=file_type or '',
                               latest_upload=latest_upload,
                               upload_error=upload_error)
 
@@ -121,9 +182,36 @@ def storage_manager():
         flash(f"An error occurred: {str(e)}", 'danger')
         return render_template('storage_manager.html', 
                               files=[], 
+                              total_files=0,
+                              page=1,
+                              total_pages=1,
+                              prefix='',
+                              file_type='',
                               upload_error=str(e))
     
 
+@storage_bp.route('/storage_jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Progress of a background storage job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+@storage_bp.route('/download/<path:blob_name>', methods=['GET'])
+@login_required
+def download_blob(blob_name):
+    """Range-capable download of a blob from the current bucket"""
+    try:
+        data_storage = DataStorage(session.get('storage_bucket', 'itc-388-youtube-r6'))
+        return _stream_blob_response(data_storage, blob_name)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        logger.error(f"Error downloading file: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @storage_bp.route('/summarize_json', methods=['GET'])
 @login_required
 def summarize_json():
@@ -137,38 +225,30 @@ def summarize_json():
                                   summary=None,
                                   filename=None)
 
+        if is_local_bucket(bucket_name):
+            # Local buckets are only chosen by admins in /config, never by the query string
+            if bucket_name != session.get('storage_bucket'):
+                return render_template('json_summary.html',
+                                      error="Local buckets can only be summarized when selected in the configuration",
+                                      summary=None,
+                                      filename=None)
+            bucket_name = session['storage_bucket']
+
         storage = DataStorage(bucket_name)
-        data = storage.load_data(source_blob_name)
-
-        # Create a summary based on the data type
-        if data is None:
-            summary = {
-                "data_type": "None",
-                "item_count": 0,
-                "keys": "No data found",
-                "sample": "No data available"
-            }
-        elif isinstance(data, list):
-            summary = {
-                "data_type": "List",
-                "item_count": len(data),
-                "keys": list(data[0].keys()) if data and isinstance(data[0], dict) else "Not dictionaries or empty list",
-                "sample": data[0] if data else "Empty list"
-            }
-        elif isinstance(data, dict):
-            summary = {
-                "data_type": "Dictionary",
-                "item_count": 1,
-                "keys": list(data.keys()),
-                "sample": {k: data[k] for k in list(data.keys())[:5]} if data else "Empty dictionary"
-            }
+        preview = request.args.get('preview') == '1'
+
+        # Stream the file through an incremental parser, so memory stays
+        # flat however large it is. Previews stop after the first batch of items.
+        summary = None
+        max_items = SUMMARY_PREVIEW_ITEMS if preview else None
+        if storage.get_snapshot_format(source_blob_name) == FORMAT_JSON:
+            with storage.open_blob_stream(source_blob_name) as stream:
+                for summary in iter_json_summaries(stream, max_items=max_items):
+                    pass
         else:
-            summary = {
-                "data_type": type(data).__name__,
-                "item_count": "Not applicable",
-                "keys": "Not a list or dictionary",
-                "sample": str(data)[:200] + "..." if len(str(data)) > 200 else str(data)
-            }
+            # NDJSON and columnar snapshots are read record by record
+            for summary in iter_record_summaries(storage.iter_records(source_blob_name), max_items=max_items):
+                pass
 
         return render_template('json_summary.html',
                               error=None,
@@ -200,7 +280,7 @@ def check_storage():
             
             # Try to list files
             try:
-                files = data_storage.list_blobs()
+                files = data_storage.list_blobs(max_results=100)
                 results['file_list'] = files
                 results['status'] = 'Successfully listed files'
             except Exception as list_error:
@@ -232,9 +312,9 @@ def check_storage():
 def test_youtube_api():
     try:
         logger.info("Testing YouTube API connection")
-        youtube_stats = YouTubeStats()
+        youtube_stats = YouTubeStats(session.get('youtube_api_key'))
         logger.info("YouTubeStats initialized, attempting to search for videos")
-        videos = youtube_stats.search_privacy_videos(max_results=5)
+        videos = youtube_stats.search_privacy_videos(max_results=5, use_cache=False)
         logger.info(f"Received response from YouTube API: type={type(videos)}")
         
         result = {
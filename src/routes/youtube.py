@@ -11,7 +11,7 @@ youtube_bp = Blueprint('youtube', __name__)
 @login_required
 def youtube_privacy():
     try:
-        youtube_stats = YouTubeStats()
+        youtube_stats = YouTubeStats(session.get('youtube_api_key'))
         videos = youtube_stats.search_privacy_videos(max_results=20)
 
         if isinstance(videos, dict) and 'error' in videos:
@@ -25,7 +25,6 @@ def youtube_privacy():
         avg_likes = format(total_likes / len(videos), ',.0f') if videos else 0
         avg_comments = format(total_comments / len(videos), ',.0f') if videos else 0
 
-        session['current_videos'] = videos
         session['last_search_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         return render_template('youtube_privacy.html', 
@@ -5,46 +5,220 @@
 #       scores
 # ╚═══════════════════════════════════════════════════════════╝
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import logging
+import multiprocessing
+import os
+import threading
+from src.sentiment_cache import SentimentCache, get_sentiment_cache
+from src.utils.metrics import REGISTRY, timed
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Natural Language API calls per process and the deadline for each
+BATCH_WORKERS = int(os.environ.get('SENTIMENT_BATCH_WORKERS', 16))
+RPC_TIMEOUT = float(os.environ.get('SENTIMENT_RPC_TIMEOUT', 10))
+
+# Local backend used when the Google API is disabled: 'textblob' or 'lexicon'
+LOCAL_BACKEND = os.environ.get('LOCAL_SENTIMENT_BACKEND', 'textblob')
+
+# Worker processes for TextBlob scoring (0 or 1 scores in the request thread)
+# and the number of texts sent to a worker per task
+LOCAL_PROCESSES = int(os.environ.get('LOCAL_SENTIMENT_PROCESSES', 0))
+PROCESS_CHUNK_SIZE = int(os.environ.get('LOCAL_SENTIMENT_CHUNK_SIZE', 250))
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    'sentiment_cache_lookups_total',
+    'Sentiment cache lookups by backend and outcome',
+    ('backend', 'outcome')
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Return the shared thread pool used for batch API calls"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS,
+                                               thread_name_prefix='sentiment')
+    return _executor
+
+_language_client = None
+_language_client_lock = threading.Lock()
+
+def get_language_client():
+    """Return the shared Natural Language API client, creating it on first use"""
+    global _language_client
+    if _language_client is None:
+        with _language_client_lock:
+            if _language_client is None:
+                from google.cloud import language_v1
+                _language_client = language_v1.LanguageServiceClient()
+    return _language_client
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+_worker_analyzer = None
+
+def _init_worker():
+    """Load TextBlob and its lexicon once when a worker process starts"""
+    global _worker_analyzer
+    _worker_analyzer = LocalSentimentAnalyzer(processes=0)
+    _worker_analyzer._score_text("warm up")
+
+def _ping(_):
+    """Round trip used to start every worker of a new pool"""
+    return os.getpid()
+
+def _score_chunk(texts):
+    """Score a chunk of texts inside a worker process"""
+    return [_worker_analyzer._score_text(text) for text in texts]
+
+def get_process_pool(processes):
+    """
+    Return the shared, pre-warmed process pool with the given number of workers
+
+    Workers are started with spawn rather than fork, since forking a
+    multi-threaded web worker is unsafe.
+
+    Args:
+        processes: Number of worker processes
+
+    Returns:
+        A ProcessPoolExecutor whose workers have TextBlob loaded
+    """
+    pool = _process_pools.get(processes)
+    if pool is not None:
+        return pool
+    with _process_pools_lock:
+        pool = _process_pools.get(processes)
+        if pool is None:
+            logger.info(f"Starting {processes} sentiment worker processes")
+            pool = ProcessPoolExecutor(max_workers=processes,
+                                       mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker)
+            # Start every worker now so the first request does not pay for it
+            try:
+                list(pool.map(_ping, range(processes)))
+            except Exception:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            _process_pools[processes] = pool
+    return pool
+
+def discard_process_pool(processes, pool):
+    """
+    Drop a broken pool (e.g. a worker was killed) so the next batch starts a new one
+
+    Args:
+        processes: Number of worker processes the pool was created with
+        pool: The pool that failed
+    """
+    with _process_pools_lock:
+        if _process_pools.get(processes) is pool:
+            del _process_pools[processes]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _analyze_with_cache(texts, backend, threshold, score_batch):
+    """
+    Score texts, only calling the analyzer for texts not already cached
+
+    Args:
+        texts: List of texts to analyze
+        backend: Name of the analyzer backend, part of the cache key
+        threshold: Category threshold of the analyzer, part of the cache key
+        score_batch: Function scoring a list of texts in order
+
+    Returns:
+        List of sentiment dictionaries in the same order as texts
+    """
+    cache = get_sentiment_cache()
+    if cache is None:
+        return score_batch(texts)
+
+    keys = [SentimentCache.make_key(text, backend, threshold) for text in texts]
+    try:
+        results = cache.get_many(keys)
+    except Exception as e:
+        logger.error(f"Error reading sentiment cache: {str(e)}")
+        results = {}
+    hits = sum(1 for key in keys if key in results)
+    CACHE_LOOKUPS.inc(hits, backend=backend, outcome='hit')
+    CACHE_LOOKUPS.inc(len(keys) - hits, backend=backend, outcome='miss')
+
+    # Duplicate texts in one batch are only scored once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in results:
+            missing.setdefault(key, text)
+
+    if missing:
+        scored = score_batch(list(missing.values()))
+        new_results = {}
+        for key, result in zip(missing, scored):
+            results[key] = result
+            if 'error' not in result:
+                new_results[key] = result
+        try:
+            cache.put_many(new_results)
+        except Exception as e:
+            logger.error(f"Error writing to sentiment cache: {str(e)}")
+
+    return [dict(results[key]) for key in keys]
+
 class SentimentAnalyzer:
+    BACKEND = 'google-language-v1'
+    THRESHOLD = 0.25
+
     def __init__(self):
         try:
             from google.cloud import language_v1
-            self.client = language_v1.LanguageServiceClient()
+            self.client = get_language_client()
             self.language_v1 = language_v1
         except Exception as e:
             logger.error(f"Error initializing Google Cloud Natural Language API: {str(e)}")
             raise e
 
-    def analyze_text(self, text):
+    def analyze_text(self, text, timeout=RPC_TIMEOUT):
         """
         Analyze the sentiment of a text using Google Cloud Natural Language API.
 
         Args:
             text: The text to analyze
+            timeout: Deadline in seconds for the API call
 
         Returns:
             Dictionary with sentiment score, magnitude, and category
         """
+        return _analyze_with_cache(
+            [text], self.BACKEND, self.THRESHOLD,
+            lambda texts: [self._score_text(t, timeout) for t in texts]
+        )[0]
+
+    def _score_text(self, text, timeout):
+        """Call the Natural Language API for one text, bypassing the cache"""
         try:
             document = self.language_v1.Document(
                 content=text,
                 type_=self.language_v1.Document.Type.PLAIN_TEXT
             )
 
-            sentiment = self.client.analyze_sentiment(
-                request={"document": document}
-            ).document_sentiment
+            with timed('language', 'analyze_sentiment'):
+                sentiment = self.client.analyze_sentiment(
+                    request={"document": document},
+                    timeout=timeout
+                ).document_sentiment
 
             score = sentiment.score
             magnitude = sentiment.magnitude
 
-            if score > 0.25:
+            if score > self.THRESHOLD:
                 category = "positive"
-            elif score < -0.25:
+            elif score < -self.THRESHOLD:
                 category = "negative"
             else:
                 category = "neutral"
@@ -63,8 +237,40 @@ class SentimentAnalyzer:
                 "error": str(e)
             }
 
+    def analyze_batch(self, texts, timeout=RPC_TIMEOUT):
+        """
+        Analyze many texts concurrently using Google Cloud Natural Language API.
+
+        Calls run on a bounded, process-wide thread pool, so a batch takes
+        roughly as long as its slowest call rather than the sum of all calls.
+
+        Args:
+            texts: List of texts to analyze
+            timeout: Deadline in seconds for each API call
+
+        Returns:
+            List of sentiment dictionaries in the same order as texts
+        """
+        if not texts:
+            return []
+        return _analyze_with_cache(
+            texts, self.BACKEND, self.THRESHOLD,
+            lambda missing: list(_get_executor().map(lambda t: self._score_text(t, timeout), missing))
+        )
+
 class LocalSentimentAnalyzer:
-    def __init__(self):
+    BACKEND = 'textblob'
+    THRESHOLD = 0.2
+
+    def __init__(self, processes=None):
+        """
+        Args:
+            processes: Worker processes for batch scoring, defaults to LOCAL_SENTIMENT_PROCESSES
+        """
+        self.processes = LOCAL_PROCESSES if processes is None else processes
+        # Texts per analyze_batch call that keep every worker process busy,
+        # callers that receive texts in small pages should gather this many
+        self.preferred_batch_size = PROCESS_CHUNK_SIZE * self.processes if self.processes > 1 else 0
         try:
             from textblob import TextBlob
             self.TextBlob = TextBlob
@@ -81,15 +287,19 @@ class LocalSentimentAnalyzer:
         Returns:
             Dictionary with sentiment score, magnitude, and category
         """
+        return _analyze_with_cache([text], self.BACKEND, self.THRESHOLD,
+                                   lambda texts: [self._score_text(t) for t in texts])[0]
+
+    def _score_text(self, text):
+        """Score one text with TextBlob, bypassing the cache"""
         try:
-            from textblob import TextBlob
-            blob = TextBlob(text)
+            blob = self.TextBlob(text)
 
             score = blob.sentiment.polarity
 
-            if score > 0.2:
+            if score > self.THRESHOLD:
                 category = "positive"
-            elif score < -0.2:
+            elif score < -self.THRESHOLD:
                 category = "negative"
             else:
                 category = "neutral"
@@ -108,4 +318,105 @@ class LocalSentimentAnalyzer:
                 "magnitude": 0,
                 "category": "neutral",
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    def analyze_batch(self, texts):
+        """
+        Analyze many texts using TextBlob.
+
+        When process mode is enabled, large batches are split into chunks
+        and scored across the worker processes.
+
+        Args:
+            texts: List of texts to analyze
+
+        Returns:
+            List of sentiment dictionaries in the same order as texts
+        """
+        return _analyze_with_cache(texts, self.BACKEND, self.THRESHOLD, self._score_batch)
+
+    @timed('textblob', 'score_batch')
+    def _score_batch(self, texts):
+        """Score texts in this process or across the process pool"""
+        if self.processes > 1 and len(texts) > PROCESS_CHUNK_SIZE:
+            pool = None
+            try:
+                pool = get_process_pool(self.processes)
+                chunks = [texts[i:i + PROCESS_CHUNK_SIZE] for i in range(0, len(texts), PROCESS_CHUNK_SIZE)]
+                return [result for chunk in pool.map(_score_chunk, chunks) for result in chunk]
+            except BrokenProcessPool as e:
+                logger.error(f"Sentiment process pool is broken, restarting it on the next batch: {str(e)}")
+                if pool is not None:
+                    discard_process_pool(self.processes, pool)
+            except Exception as e:
+                logger.error(f"Error scoring in process pool, scoring in-process: {str(e)}")
+        return [self._score_text(text) for text in texts]
+
+class LexiconSentimentAnalyzer:
+    """
+    Local analyzer scoring whole batches with the vectorized lexicon engine.
+
+    Uses the same lexicon and thresholds as LocalSentimentAnalyzer, so scores
+    match TextBlob closely. Results are not written to the sentiment cache,
+    since scoring a text is cheaper than looking it up.
+    """
+    BACKEND = 'lexicon'
+    THRESHOLD = 0.2
+
+    def __init__(self):
+        from src.sentiment_lexicon import get_lexicon
+        self.lexicon = get_lexicon()
+
+    def analyze_text(self, text):
+        """
+        Analyze the sentiment of a text using the lexicon engine.
+
+        Args:
+            text: The text to analyze
+
+        Returns:
+            Dictionary with sentiment score, magnitude, and category
+        """
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        """
+        Analyze many texts in one vectorized pass.
+
+        Args:
+            texts: List of texts to analyze
+
+        Returns:
+            List of sentiment dictionaries in the same order as texts
+        """
+        try:
+            with timed('lexicon', 'score_batch'):
+                polarities, subjectivities = self.lexicon.score(texts)
+        except Exception as e:
+            logger.error(f"Error analyzing sentiment with lexicon: {str(e)}")
+            return [{"score": 0, "magnitude": 0, "category": "neutral", "error": str(e)} for _ in texts]
+
+        results = []
+        for score, magnitude in zip(polarities.tolist(), subjectivities.tolist()):
+            if score > self.THRESHOLD:
+                category = "positive"
+            elif score < -self.THRESHOLD:
+                category = "negative"
+            else:
+                category = "neutral"
+            results.append({"score": score, "magnitude": magnitude, "category": category})
+        return results
+
+def create_local_analyzer():
+    """
+    Create the local analyzer selected by LOCAL_SENTIMENT_BACKEND
+
+    Returns:
+        A LexiconSentimentAnalyzer or LocalSentimentAnalyzer
+    """
+    if LOCAL_BACKEND == 'lexicon':
+        try:
+            return LexiconSentimentAnalyzer()
+        except Exception as e:
+            logger.error(f"Error loading sentiment lexicon, falling back to TextBlob: {str(e)}")
+    return LocalSentimentAnalyzer()
\ No newline at end of file
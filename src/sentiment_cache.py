@@ -0,0 +1,164 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   sentiment_cache.py
+#       Persistent cache of sentiment results so the same
+#       comment text is never scored twice by the same analyzer
+# ╚═══════════════════════════════════════════════════════════╝
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'sentiment_cache.db'
+)
+
+class SentimentCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=200000):
+        """
+        Open (or create) the SQLite cache file
+
+        Args:
+            path: Location of the SQLite database
+            max_entries: Number of results kept before the least recently used are evicted
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                key TEXT PRIMARY KEY,
+                score REAL NOT NULL,
+                magnitude REAL NOT NULL,
+                category TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sentiment_last_used ON sentiment_cache (last_used)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text, backend, thresholds):
+        """
+        Build the content address for a text scored by a given analyzer
+
+        Args:
+            text: The analyzed text
+            backend: Name of the analyzer backend
+            thresholds: Category thresholds used by the analyzer
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        normalized = ' '.join(unicodedata.normalize('NFC', text or '').split())
+        raw = f"{backend}\x1f{thresholds}\x1f{normalized}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """
+        Look up cached results
+
+        Args:
+            keys: Cache keys from make_key
+
+        Returns:
+            Dictionary mapping each cached key to its sentiment dictionary
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # Stay below SQLite's host parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, score, magnitude, category FROM sentiment_cache WHERE key IN ({placeholders})',
+                    chunk
+                ).fetchall()
+                for key, score, magnitude, category in rows:
+                    found[key] = {'score': score, 'magnitude': magnitude, 'category': category}
+            if found:
+                now = time.time()
+                self._conn.executemany('UPDATE sentiment_cache SET last_used = ? WHERE key = ?',
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, results):
+        """
+        Store sentiment results
+
+        Args:
+            results: Dictionary mapping cache keys to sentiment dictionaries
+        """
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO sentiment_cache (key, score, magnitude, category, last_used) VALUES (?, ?, ?, ?, ?)',
+                [(key, r['score'], r['magnitude'], r['category'], now) for key, r in results.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used rows once the cache is over its size limit"""
+        count = self._conn.execute('SELECT COUNT(*) FROM sentiment_cache').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Evict a little extra so we do not run this on every insert
+        excess = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            'DELETE FROM sentiment_cache WHERE key IN '
+            '(SELECT key FROM sentiment_cache ORDER BY last_used LIMIT ?)',
+            (excess,)
+        )
+        logger.info(f"Evicted {excess} entries from the sentiment cache")
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries"""
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM sentiment_cache').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'entries': size}
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+def get_sentiment_cache():
+    """
+    Return the process-wide sentiment cache
+
+    Returns:
+        A SentimentCache, or None if caching is disabled or unavailable.
+        A cache that failed to open is not retried until the process restarts.
+    """
+    global _cache, _cache_failed
+    if _cache is None:
+        max_entries = int(os.environ.get('SENTIMENT_CACHE_SIZE', 200000))
+        if max_entries <= 0 or _cache_failed:
+            return None
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = SentimentCache(os.environ.get('SENTIMENT_CACHE_PATH', DEFAULT_CACHE_PATH),
+                                            max_entries)
+                except Exception as e:
+                    logger.error(f"Error opening sentiment cache, caching disabled: {str(e)}")
+                    _cache_failed = True
+    return _cache
@@ -0,0 +1,262 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   sentiment_lexicon.py
+#       Vectorized lexicon sentiment scoring. Loads the same
+#       polarity/subjectivity lexicon TextBlob uses into NumPy
+#       arrays once and scores whole batches of comments at a time
+# ╚═══════════════════════════════════════════════════════════╝
+
+from xml.etree import ElementTree
+import importlib.util
+import logging
+import os
+import re
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Same negations and modifier part-of-speech tag TextBlob's pattern analyzer uses
+NEGATIONS = ("no", "not", "n't", "never")
+MODIFIER_POS = "RB"
+EXCLAMATION_BOOST = 1.25
+NEGATION_FACTOR = -0.5
+
+# Texts per vectorized pass, keeps the token arrays small enough to stay in cache
+CHUNK_SIZE = 5000
+
+# Like TextBlob's tokenizer, contractions split at the apostrophe ("isn't" ->
+# "is n ' t"), so "n't" never reaches the negation check on plain text
+_TOKEN_RE = re.compile(r"!|\w+(?:-\w+)*")
+
+def default_lexicon_path():
+    """Return the path of the en-sentiment.xml lexicon shipped with TextBlob"""
+    spec = importlib.util.find_spec('textblob')
+    if spec is None or not spec.submodule_search_locations:
+        raise RuntimeError("TextBlob is not installed and no SENTIMENT_LEXICON_PATH was given")
+    return os.path.join(list(spec.submodule_search_locations)[0], 'en', 'en-sentiment.xml')
+
+class _TokenIds(dict):
+    """Token to id table that classifies unknown tokens on first sight"""
+
+    def __init__(self, vocab, unknown_ids):
+        super().__init__(vocab)
+        self.unknown_ids = unknown_ids
+
+    def __missing__(self, token):
+        # Unknown words only matter for how far negations and modifiers reach
+        if len(token) > 2:
+            token_id = self.unknown_ids[2]
+        elif len(token.strip("'")) > 1:
+            token_id = self.unknown_ids[1]
+        else:
+            token_id = self.unknown_ids[0]
+        self[token] = token_id
+        return token_id
+
+class SentimentLexicon:
+    """
+    Polarity/subjectivity lexicon held in compact arrays.
+
+    Scoring follows TextBlob's PatternAnalyzer: the result is the mean of
+    the assessed words, modifiers ("very good") scale the next word,
+    negations ("not good") flip and halve it and "!" boosts it. A negation
+    following an "-ly" modifier ("really not good") negates the modifier's
+    assessment instead and leaves the modifier in place. The rules are
+    applied with array operations over every token of a batch at once.
+    Emoticons are not handled, so scores can differ from TextBlob on
+    comments that use them.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: Location of a pattern-style sentiment XML lexicon, defaults to TextBlob's
+        """
+        path = path or default_lexicon_path()
+        senses = {}
+        for word in ElementTree.parse(path).getroot().findall('word'):
+            form = word.attrib.get('form')
+            if not form:
+                continue
+            psi = (float(word.attrib.get('polarity', 0.0)),
+                   float(word.attrib.get('subjectivity', 0.0)),
+                   float(word.attrib.get('intensity', 1.0)))
+            senses.setdefault(form, {}).setdefault(word.attrib.get('pos'), []).append(psi)
+
+        # Average the senses per part of speech, then across parts of speech
+        values = {}
+        modifiers = set()
+        for form, by_pos in senses.items():
+            per_pos = [np.mean(psi, axis=0) for psi in by_pos.values()]
+            values[form] = tuple(np.mean(per_pos, axis=0))
+            if MODIFIER_POS in by_pos:
+                modifiers.add(form)
+
+        # Like TextBlob, derive adverbs from adjectives ("terrible" -> "terribly")
+        for form, by_pos in list(senses.items()):
+            if 'JJ' in by_pos:
+                adverb = form[:-1] + 'i' if form.endswith('y') else form
+                if adverb.endswith('le'):
+                    adverb = adverb[:-2]
+                values[adverb + 'ly'] = tuple(np.mean(by_pos['JJ'], axis=0))
+                modifiers.add(adverb + 'ly')
+
+        words = sorted(set(values) | set(NEGATIONS))
+        self.vocab = {word: i for i, word in enumerate(words)}
+        size = len(words) + 4
+        self.polarity = np.zeros(size)
+        self.subjectivity = np.zeros(size)
+        self.intensity = np.ones(size)
+        self.known = np.zeros(size, dtype=bool)
+        self.modifier = np.zeros(size, dtype=bool)
+        self.negation = np.zeros(size, dtype=bool)
+        self.breaks_modifier = np.zeros(size, dtype=bool)
+        self.breaks_negation = np.zeros(size, dtype=bool)
+        self.long_negation = np.zeros(size, dtype=bool)
+        self.takes_negation = np.zeros(size, dtype=bool)
+
+        for word, i in self.vocab.items():
+            if word in values:
+                self.polarity[i], self.subjectivity[i], self.intensity[i] = values[word]
+                self.known[i] = True
+                self.modifier[i] = word in modifiers
+                # TextBlob only lets "-ly" modifiers carry a negation ("really not good")
+                self.takes_negation[i] = self.modifier[i] and word.endswith('ly')
+            elif word in NEGATIONS:
+                # Breaks a modifier unless the modifier takes the negation
+                self.long_negation[i] = len(word) > 2
+            else:
+                self.breaks_modifier[i] = len(word) > 2
+            self.negation[i] = word in NEGATIONS
+
+        # Ids for "!" and for short, medium and long unknown tokens
+        self.exclamation_id = len(words)
+        self.unknown_ids = (len(words) + 1, len(words) + 2, len(words) + 3)
+        self.breaks_negation[self.unknown_ids[1]] = True
+        self.breaks_negation[self.unknown_ids[2]] = True
+        self.breaks_modifier[self.unknown_ids[2]] = True
+        self.vocab['!'] = self.exclamation_id
+        logger.info(f"Loaded sentiment lexicon with {len(values)} words from {path}")
+
+    def tokenize(self, texts):
+        """
+        Convert texts to one flat array of token ids
+
+        Args:
+            texts: List of texts
+
+        Returns:
+            Tuple of (token id array, tokens per text array)
+        """
+        table = _TokenIds(self.vocab, self.unknown_ids)
+        lookup = table.__getitem__
+        ids = []
+        lengths = []
+        for text in texts:
+            tokens = _TOKEN_RE.findall((text or '').lower().replace("n't", " n't"))
+            lengths.append(len(tokens))
+            ids.extend(map(lookup, tokens))
+        return np.array(ids, dtype=np.int64), np.array(lengths, dtype=np.int64)
+
+    def score(self, texts, chunk_size=CHUNK_SIZE):
+        """
+        Score a batch of texts
+
+        Args:
+            texts: List of texts
+            chunk_size: Texts scored per vectorized pass, bounds temporary memory
+
+        Returns:
+            Tuple of (polarity array, subjectivity array), one value per text
+        """
+        if len(texts) <= chunk_size:
+            return self._score_chunk(texts)
+        results = [self._score_chunk(texts[i:i + chunk_size]) for i in range(0, len(texts), chunk_size)]
+        return (np.concatenate([polarity for polarity, _ in results]),
+                np.concatenate([subjectivity for _, subjectivity in results]))
+
+    def _score_chunk(self, texts):
+        """Score texts with one vectorized pass over all of their tokens"""
+        n_texts = len(texts)
+        ids, lengths = self.tokenize(texts)
+        if len(ids) == 0:
+            return np.zeros(n_texts), np.zeros(n_texts)
+
+        positions = np.arange(len(ids))
+        doc = np.repeat(np.arange(n_texts), lengths)
+        doc_start = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        known = self.known[ids]
+
+        # Index of the closest known word before each token in the same text
+        prev_known = np.full(len(ids), -1)
+        prev_known[1:] = np.maximum.accumulate(np.where(known, positions, -1))[:-1]
+        prev_known[prev_known < doc_start] = -1
+        has_prev = prev_known >= 0
+        prev_index = np.where(has_prev, prev_known, 0)
+
+        prev_ids = ids[prev_index]
+        is_negation = self.negation[ids]
+
+        # Number of tokens breaking a modifier/negation up to and including each position
+        modifier_breaks = np.cumsum(self.breaks_modifier[ids]
+                                    | (self.long_negation[ids] & ~(has_prev & self.takes_negation[prev_ids])))
+        negation_breaks = np.cumsum(self.breaks_negation[ids])
+        before = np.maximum(positions - 1, 0)
+        modifier_active = (has_prev & self.modifier[prev_ids]
+                           & (modifier_breaks[before] - modifier_breaks[prev_index] == 0))
+
+        # A known word directly following a modifier is merged into its assessment
+        modified = known & modifier_active
+
+        # A negation following an active "-ly" modifier negates the modifier's assessment
+        absorbed = is_negation & modifier_active & self.takes_negation[prev_ids]
+
+        # A known word is negated by a negation after the previous known word
+        last_negation = np.full(len(ids), -1)
+        last_negation[1:] = np.maximum.accumulate(np.where(is_negation & ~absorbed, positions, -1))[:-1]
+        negation_index = np.maximum(last_negation, 0)
+        negated = (known & (last_negation >= doc_start) & (last_negation >= prev_known)
+                   & (negation_breaks[before] - negation_breaks[negation_index] == 0))
+
+        intensity = np.where(negated, 1.0 / np.where(self.intensity[ids] == 0, 1.0, self.intensity[ids]),
+                             self.intensity[ids])
+        scale = np.where(modified, intensity[prev_index], 1.0)
+        polarity = np.clip(self.polarity[ids] * scale, -1.0, 1.0)
+        subjectivity = np.clip(self.subjectivity[ids] * scale, -1.0, 1.0)
+
+        # Group known words into assessments, each ending at its last word
+        starts = known & ~modified
+        group = np.cumsum(starts) - 1
+        known_positions = positions[known]
+        known_groups = group[known]
+        n_groups = int(starts.sum())
+        last = known_positions[np.r_[known_groups[1:] != known_groups[:-1], True]] if n_groups else known_positions
+        group_negated = ((np.bincount(known_groups, weights=negated[known], minlength=n_groups)
+                          + np.bincount(group[prev_known[absorbed]], minlength=n_groups)) > 0)
+
+        # Exclamation marks boost the assessment before them, a boost is lost
+        # when a later word joins the assessment ("really ! good")
+        exclaimed = prev_known[(ids == self.exclamation_id) & has_prev]
+        exclaimed = exclaimed[last[group[exclaimed]] == exclaimed]
+        boosts = np.bincount(group[exclaimed], minlength=n_groups)
+
+        group_polarity = np.clip(polarity[last] * EXCLAMATION_BOOST ** boosts, -1.0, 1.0)
+        group_polarity = np.where(group_negated, group_polarity * NEGATION_FACTOR, group_polarity)
+        group_subjectivity = subjectivity[last]
+        group_doc = doc[last]
+
+        counts = np.maximum(np.bincount(group_doc, minlength=n_texts), 1)
+        return (np.bincount(group_doc, weights=group_polarity, minlength=n_texts) / counts,
+                np.bincount(group_doc, weights=group_subjectivity, minlength=n_texts) / counts)
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+def get_lexicon():
+    """Return the process-wide lexicon, loading it on first use"""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                _lexicon = SentimentLexicon(os.environ.get('SENTIMENT_LEXICON_PATH'))
+    return _lexicon
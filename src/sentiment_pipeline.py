@@ -0,0 +1,131 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   sentiment_pipeline.py
+#       Staged fetch -> analyze -> persist pipeline for the
+#       sentiment page. Comment pages are scored while the next
+#       page is still being fetched, and the snapshot is written
+#       by a background job after the response is built
+# ╚═══════════════════════════════════════════════════════════╝
+
+from src.data_storage import DataStorage
+from src.utils.jobs import get_job_queue
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Comment pages fetched ahead of the analysis stage
+PIPELINE_QUEUE_PAGES = int(os.environ.get('SENTIMENT_PIPELINE_PAGES', 4))
+
+# Bucket the analyzed comments are saved to
+COMMENTS_BUCKET = os.environ.get('SENTIMENT_COMMENTS_BUCKET', 'data_privacy_analysis')
+
+_DONE = object()
+
+def _fetch_pages(youtube_stats, video_id, max_comments, pages, stop):
+    """Producer stage: push comment pages into the queue until done or stopped"""
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for page in youtube_stats.iter_comment_pages(video_id, max_comments=max_comments):
+            if not put(page):
+                return
+        put(_DONE)
+    except Exception as e:
+        put(e)
+
+def analyze_comments(youtube_stats, video_id, analyzer, max_comments, queue_pages=PIPELINE_QUEUE_PAGES):
+    """
+    Fetch and score the comments of a video with overlapping stages
+
+    A producer thread follows the comment pages of the video while the
+    calling thread scores them with analyzer.analyze_batch. Pages are
+    scored as they arrive, or gathered until the analyzer's
+    preferred_batch_size is reached, so a process pool gets batches large
+    enough to split across its workers. At most queue_pages pages wait
+    between the two stages.
+
+    Args:
+        youtube_stats: YouTubeStats used to fetch the comments
+        video_id: YouTube video ID
+        analyzer: Sentiment analyzer with analyze_batch
+        max_comments: Maximum number of comments to fetch
+        queue_pages: Pages buffered between fetching and scoring
+
+    Returns:
+        List of comment dictionaries, those with text carry a 'sentiment' key
+
+    Raises:
+        RuntimeError: If the YouTube API returns an error
+    """
+    pages = queue.Queue(maxsize=max(queue_pages, 1))
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_fetch_pages,
+        args=(youtube_stats, video_id, max_comments, pages, stop),
+        name=f"comments-{video_id}",
+        daemon=True
+    )
+    producer.start()
+
+    batch_size = getattr(analyzer, 'preferred_batch_size', 0)
+    comments = []
+    pending = []
+    try:
+        while True:
+            page = pages.get()
+            if isinstance(page, Exception):
+                raise page
+            if page is not _DONE:
+                pending.extend(comment for comment in page if comment['text'])
+                comments.extend(page)
+                if len(pending) < batch_size:
+                    continue
+
+            if pending:
+                sentiments = analyzer.analyze_batch([comment['text'] for comment in pending])
+                for comment, sentiment in zip(pending, sentiments):
+                    comment['sentiment'] = sentiment
+                pending = []
+            if page is _DONE:
+                break
+    finally:
+        # Let the producer exit if we stopped early
+        stop.set()
+    return comments
+
+def _save_comments(job, bucket_name, video_id, comments):
+    job.update(10, f"Saving {len(comments)} comments for {video_id}")
+    blob_name = DataStorage(bucket_name).save_comments_data(video_id, comments, if_generation_match=0)
+    if not blob_name:
+        raise RuntimeError(f"Saving comments for {video_id} failed")
+    return blob_name
+
+def save_comments_in_background(video_id, comments, bucket_name=COMMENTS_BUCKET):
+    """
+    Persist stage: queue the snapshot write so the response does not wait for it
+
+    A save for the same video that is still in flight is reused.
+
+    Args:
+        video_id: YouTube video ID
+        comments: Analyzed comment dictionaries
+        bucket_name: Bucket to save to
+
+    Returns:
+        The Job
+    """
+    job, _ = get_job_queue().submit(
+        ('save_comments', bucket_name, video_id),
+        f"Save comments for {video_id}",
+        _save_comments, bucket_name, video_id, comments
+    )
+    return job
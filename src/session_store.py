@@ -0,0 +1,246 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   session_store.py
+#       Server-side sessions kept in SQLite. The cookie only
+#       carries a random session id, which is replaced on login
+# ╚═══════════════════════════════════════════════════════════╝
+
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+import logging
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'sessions.db'
+)
+
+# Seconds between sweeps of expired sessions
+PURGE_INTERVAL = int(os.environ.get('SESSION_PURGE_INTERVAL', 300))
+
+_SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{32,64}$')
+
+class SessionStore:
+    """
+    SQLite table of sessions with expiry times.
+
+    Expired rows are never returned and are deleted by purge_expired,
+    which the session interface calls at most every PURGE_INTERVAL seconds.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_PATH):
+        """
+        Open (or create) the SQLite session store
+
+        Args:
+            path: Location of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_purge = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expires_at);
+        ''')
+        self._conn.commit()
+
+    def load(self, session_id):
+        """
+        Return the stored session data and expiry
+
+        Returns:
+            Tuple of (serialized data, expires_at), or None if missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?',
+                (session_id, time.time())
+            ).fetchone()
+        return row
+
+    def save(self, session_id, data, expires_at):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)',
+                (session_id, data, expires_at)
+            )
+            self._conn.commit()
+
+    def touch(self, session_id, expires_at):
+        """Extend the life of a session without rewriting its data"""
+        with self._lock:
+            self._conn.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (expires_at, session_id))
+            self._conn.commit()
+
+    def delete(self, session_id):
+        """Remove a session"""
+        with self._lock:
+            self._conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            self._conn.commit()
+
+    def purge_expired(self, force=False):
+        """
+        Delete expired sessions
+
+        Args:
+            force: Purge even if the last sweep was less than PURGE_INTERVAL ago
+
+        Returns:
+            Number of rows removed
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_purge < PURGE_INTERVAL:
+                return 0
+            self._last_purge = now
+            removed = self._conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,)).rowcount
+            self._conn.commit()
+        if removed:
+            logger.info(f"Purged {removed} expired session rows")
+        return removed
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dictionary that remembers its id and whether it was changed"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+    def regenerate(self, store):
+        """
+        Move the session to a new id and drop the row under the old one
+
+        Called when the user logs in, so an id planted before login
+        (session fixation) never refers to an authenticated session.
+
+        Args:
+            store: SessionStore holding the session
+        """
+        if not self.new:
+            store.delete(self.sid)
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+class SqliteSessionInterface(SessionInterface):
+    """
+    Flask session interface backed by a SessionStore.
+
+    The cookie holds a random 256 bit id, so requests no longer carry or
+    re-verify the session contents. Data is serialized with the same tagged
+    JSON format Flask uses for cookie sessions. Rows live for the app's
+    PERMANENT_SESSION_LIFETIME; an unchanged session is only written back
+    once less than half of that remains, so most requests do not write.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store=None):
+        """
+        Args:
+            store: SessionStore to use, the process-wide store when omitted
+        """
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or get_session_store()
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and _SESSION_ID_RE.match(sid):
+            row = self.store.load(sid)
+            if row is not None:
+                data, expires_at = row
+                try:
+                    return ServerSideSession(self.serializer.loads(data), sid=sid, expires_at=expires_at)
+                except Exception as e:
+                    logger.error(f"Error reading session: {str(e)}")
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        lifetime = self._lifetime(app)
+        if session.modified or session.new:
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), now + lifetime)
+        elif session.expires_at is not None and session.expires_at - now < lifetime / 2:
+            self.store.touch(session.sid, now + lifetime)
+        else:
+            return
+        self.store.purge_expired()
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+_store = None
+_store_lock = threading.Lock()
+
+def _forget_store():
+    """Drop the inherited store in a forked child, it reopens its own connection"""
+    global _store, _store_lock
+    _store = None
+    _store_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_forget_store)
+
+def get_session_store():
+    """Return the process-wide session store, located by SESSION_DB_PATH"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore(os.environ.get('SESSION_DB_PATH', DEFAULT_SESSION_PATH))
+    return _store
+
+def rotate_session_id(session):
+    """
+    Give the current session a new id, keeping its data
+
+    A no-op for Flask's cookie sessions, which have no id to fixate.
+
+    Args:
+        session: The current session
+    """
+    if isinstance(session, ServerSideSession):
+        session.regenerate(current_app.session_interface.store)
@@ -0,0 +1,439 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   snapshot_format.py
+#       Encoders and readers for the snapshot formats written by
+#       DataStorage: pretty-printed JSON, gzip-compressed NDJSON
+#       and a columnar layout whose fields can be read one by one
+# ╚═══════════════════════════════════════════════════════════╝
+
+import gzip
+import json
+import logging
+import re
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+FORMAT_JSON = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_COLUMNAR = 'columnar'
+FORMATS = (FORMAT_JSON, FORMAT_NDJSON, FORMAT_COLUMNAR)
+
+EXTENSIONS = {
+    FORMAT_JSON: '.json',
+    FORMAT_NDJSON: '.ndjson.gz',
+    FORMAT_COLUMNAR: '.ytcol',
+}
+
+CONTENT_TYPES = {
+    FORMAT_JSON: 'application/json',
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_COLUMNAR: 'application/octet-stream',
+}
+
+# Columnar files start with the magic bytes, then the header length and the JSON header
+COLUMNAR_MAGIC = b'YTCOL1\n\x00'
+_HEADER_LENGTH = struct.Struct('<I')
+_DATA_START = len(COLUMNAR_MAGIC) + _HEADER_LENGTH.size
+
+# Rows per row group, the unit a row range read has to decode
+ROW_GROUP_SIZE = 10000
+
+# Bytes read from the start of a file to detect its format or load a columnar header
+HEADER_READ_SIZE = 64 * 1024
+
+# Column segments closer than this are fetched with a single read
+_COALESCE_GAP = 64 * 1024
+
+# Decimal strings that round-trip through int64, like the view counts the YouTube API returns
+_INT_STRING_RE = re.compile(r'0|-?[1-9]\d{0,17}')
+
+_NDJSON_SUFFIXES = ('.ndjson', '.ndjson.gz', '.jsonl', '.jsonl.gz')
+
+class _Missing:
+    """Marks a field that is absent from a row"""
+
+    def __repr__(self):
+        return 'MISSING'
+
+MISSING = _Missing()
+
+def snapshot_name(base, snapshot_format):
+    """Append the file extension of a snapshot format to a blob name"""
+    return base + EXTENSIONS[snapshot_format]
+
+def encode_snapshot(records, snapshot_format, row_group_size=ROW_GROUP_SIZE):
+    """
+    Serialize records in one of the snapshot formats
+
+    Args:
+        records: List of records, dictionaries for the columnar format
+        snapshot_format: One of FORMATS
+        row_group_size: Rows per row group of the columnar format
+
+    Returns:
+        Encoded bytes
+
+    Raises:
+        ValueError: If the format is unknown or the records do not fit it
+    """
+    if snapshot_format == FORMAT_JSON:
+        return json.dumps(records, indent=2, default=str).encode('utf-8')
+    if snapshot_format == FORMAT_NDJSON:
+        lines = (json.dumps(record, separators=(',', ':'), default=str) for record in records)
+        return gzip.compress('\n'.join(lines).encode('utf-8') + b'\n', mtime=0)
+    if snapshot_format == FORMAT_COLUMNAR:
+        return _encode_columnar(records, row_group_size)
+    raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+
+def detect_format(head, name=None, metadata=None):
+    """
+    Work out the format of a stored snapshot
+
+    The snapshot_format metadata written by DataStorage wins. Without it the
+    first bytes decide: columnar files have a magic header, a top-level array
+    is JSON, and a complete JSON value on the first line followed by more
+    lines is NDJSON.
+
+    Args:
+        head: First bytes of the stored file (HEADER_READ_SIZE is plenty)
+        name: Optional blob name, used for .ndjson/.jsonl files
+        metadata: Optional custom metadata of the blob
+
+    Returns:
+        One of FORMATS
+    """
+    snapshot_format = (metadata or {}).get('snapshot_format')
+    if snapshot_format in FORMATS:
+        return snapshot_format
+    head = bytes(head)
+    if head.startswith(COLUMNAR_MAGIC):
+        return FORMAT_COLUMNAR
+    if name and name.endswith(_NDJSON_SUFFIXES):
+        return FORMAT_NDJSON
+    if head[:2] == b'\x1f\x8b':
+        try:
+            # Decompress just enough of the (possibly truncated) stream to look at it
+            head = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head, HEADER_READ_SIZE)
+        except zlib.error:
+            return FORMAT_JSON
+
+    text = head.lstrip()
+    if text.startswith(b'{'):
+        first_line, _, rest = text.partition(b'\n')
+        if rest.strip():
+            try:
+                json.loads(first_line)
+                return FORMAT_NDJSON
+            except ValueError:
+                pass
+    return FORMAT_JSON
+
+def project_record(record, columns):
+    """
+    Keep only the selected fields of a record
+
+    Args:
+        record: Dictionary to project
+        columns: Field names, dotted names select nested fields ("sentiment.score")
+
+    Returns:
+        A new dictionary with the selected fields that exist in the record
+    """
+    if columns is None or not isinstance(record, dict):
+        return record
+    projected = {}
+    for column in columns:
+        path = column.split('.')
+        value = record
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            _set_path(projected, path, value)
+    return projected
+
+def iter_ndjson_records(stream, start=0, stop=None):
+    """
+    Read records from a decompressed NDJSON stream
+
+    Args:
+        stream: Binary file-like object
+        start: Index of the first record to return
+        stop: Index after the last record to return, None for all
+
+    Yields:
+        Records, parsing stops once stop is reached
+    """
+    index = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        if stop is not None and index >= stop:
+            return
+        if index >= start:
+            yield json.loads(line)
+        index += 1
+
+def decode_snapshot(raw, name=None, metadata=None):
+    """
+    Decode a whole stored snapshot, whatever its format
+
+    Args:
+        raw: Stored bytes (or a memory map of them)
+        name: Optional blob name
+        metadata: Optional custom metadata of the blob
+
+    Returns:
+        The decoded data, a list of records for NDJSON and columnar files
+    """
+    snapshot_format = detect_format(raw[:HEADER_READ_SIZE], name, metadata)
+    if snapshot_format == FORMAT_COLUMNAR:
+        reader = ColumnarReader(lambda offset, length: raw[offset:offset + length], len(raw))
+        return list(reader.iter_records())
+
+    if raw[:2] == b'\x1f\x8b':
+        raw = gzip.decompress(raw)
+    text = str(raw, 'utf-8')
+    if snapshot_format == FORMAT_NDJSON:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return json.loads(text)
+
+class ColumnarReader:
+    """
+    Reads a columnar snapshot through ranged reads
+
+    Only the header and the segments of the selected columns in the
+    requested row groups are fetched and decompressed.
+    """
+
+    def __init__(self, read_range, size):
+        """
+        Args:
+            read_range: Callable (offset, length) returning the stored bytes in that range
+            size: Total size of the stored file
+        """
+        self._read_range = read_range
+        self.size = size
+
+        head = bytes(read_range(0, min(HEADER_READ_SIZE, size)))
+        if not head.startswith(COLUMNAR_MAGIC):
+            raise ValueError("Not a columnar snapshot")
+        (header_length,) = _HEADER_LENGTH.unpack_from(head, len(COLUMNAR_MAGIC))
+        header_end = _DATA_START + header_length
+        if len(head) < header_end:
+            head += bytes(read_range(len(head), header_end - len(head)))
+
+        self.header = json.loads(head[_DATA_START:header_end])
+        self.data_offset = header_end
+        self.rows = self.header['rows']
+        self.columns = self.header['columns']
+
+    @property
+    def column_names(self):
+        return [column['name'] for column in self.columns]
+
+    def _select(self, columns):
+        """Indexes of the selected columns, a name also selects the columns nested under it"""
+        if columns is None:
+            return list(range(len(self.columns)))
+        selected = []
+        for i, column in enumerate(self.columns):
+            name = column['name']
+            if any(name == wanted or name.startswith(wanted + '.') for wanted in columns):
+                selected.append(i)
+        return selected
+
+    def _fetch(self, segments):
+        """Read (offset, length) segments, merging neighbouring ones into single reads"""
+        results = {}
+        order = sorted(set(segments))
+        i = 0
+        while i < len(order):
+            start, length = order[i]
+            end = start + length
+            j = i + 1
+            while j < len(order) and order[j][0] - end <= _COALESCE_GAP:
+                end = max(end, order[j][0] + order[j][1])
+                j += 1
+            data = bytes(self._read_range(self.data_offset + start, end - start)) if end > start else b''
+            for offset, size in order[i:j]:
+                results[(offset, size)] = data[offset - start:offset - start + size]
+            i = j
+        return results
+
+    def iter_blocks(self, columns=None, start=0, stop=None):
+        """
+        Decode the selected columns one row group at a time
+
+        Args:
+            columns: Column names, None for all of them
+            start: First row
+            stop: Row after the last one, None for the end
+
+        Yields:
+            Tuples of (number of rows, {column index: values}), numeric
+            columns as NumPy arrays and the others as lists that may hold MISSING
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        selected = self._select(columns)
+        group_start = 0
+        for group in self.header['row_groups']:
+            group_stop = group_start + group['rows']
+            if group_stop > start and group_start < stop:
+                segments = {i: tuple(group['segments'][i]) for i in selected}
+                fetched = self._fetch(segments.values())
+                lo = max(start, group_start) - group_start
+                hi = min(stop, group_stop) - group_start
+                values = {i: _decode_column(self.columns[i]['type'], fetched[segments[i]], group['rows'])[lo:hi]
+                          for i in selected}
+                yield hi - lo, values
+            if group_stop >= stop:
+                break
+            group_start = group_stop
+
+    def read_columns(self, columns=None, start=0, stop=None):
+        """
+        Read whole columns without building records
+
+        Args:
+            columns: Column names, None for all of them
+            start: First row
+            stop: Row after the last one, None for the end
+
+        Returns:
+            Dictionary mapping column names to NumPy arrays for numeric columns
+            (including digit strings such as view counts) and to lists with
+            None for missing values otherwise
+        """
+        selected = self._select(columns)
+        parts = {i: [] for i in selected}
+        for _, values in self.iter_blocks(columns, start, stop):
+            for i, column in values.items():
+                parts[i].append(column)
+
+        import numpy as np
+        result = {}
+        for i in selected:
+            name = self.columns[i]['name']
+            if self.columns[i]['type'] == 'json':
+                result[name] = [None if value is MISSING else value for part in parts[i] for value in part]
+            else:
+                dtype = '<f8' if self.columns[i]['type'] == 'float64' else '<i8'
+                result[name] = np.concatenate(parts[i]) if parts[i] else np.array([], dtype=dtype)
+        return result
+
+    def iter_records(self, columns=None, start=0, stop=None):
+        """
+        Rebuild records from the selected columns
+
+        Args:
+            columns: Column names, None for all of them
+            start: First row
+            stop: Row after the last one, None for the end
+
+        Yields:
+            Record dictionaries with the original nesting and value types
+        """
+        for count, values in self.iter_blocks(columns, start, stop):
+            decoded = []
+            for i, column in values.items():
+                column_type = self.columns[i]['type']
+                if column_type == 'int64-str':
+                    column = [str(value) for value in column.tolist()]
+                elif column_type != 'json':
+                    column = column.tolist()
+                decoded.append((self.columns[i]['path'], column))
+            for row in range(count):
+                record = {}
+                for path, column in decoded:
+                    if column[row] is not MISSING:
+                        _set_path(record, path, column[row])
+                yield record
+
+def _set_path(record, path, value):
+    for key in path[:-1]:
+        record = record.setdefault(key, {})
+    record[path[-1]] = value
+
+def _flatten(record, prefix=()):
+    """Yield (path, value) pairs for the leaves of a record, non-empty dictionaries are descended into"""
+    for key, value in record.items():
+        path = prefix + (str(key),)
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, path)
+        else:
+            yield path, value
+
+def _column_type(values):
+    """Pick the most compact encoding that gives every value back unchanged"""
+    if any(value is MISSING for value in values):
+        return 'json'
+    if all(type(value) is int and -2 ** 63 <= value < 2 ** 63 for value in values):
+        return 'int64'
+    if all(type(value) is float for value in values):
+        return 'float64'
+    if all(isinstance(value, str) and _INT_STRING_RE.fullmatch(value) for value in values):
+        return 'int64-str'
+    return 'json'
+
+def _encode_column(column_type, values):
+    if column_type == 'json':
+        lines = ('' if value is MISSING else json.dumps(value, separators=(',', ':'), default=str)
+                 for value in values)
+        return zlib.compress('\n'.join(lines).encode('utf-8'))
+    if column_type == 'int64-str':
+        values = [int(value) for value in values]
+    import numpy as np
+    dtype = '<f8' if column_type == 'float64' else '<i8'
+    return zlib.compress(np.asarray(values, dtype=dtype).tobytes())
+
+def _decode_column(column_type, data, rows):
+    raw = zlib.decompress(data)
+    if column_type == 'json':
+        return [MISSING if not line else json.loads(line) for line in raw.decode('utf-8').split('\n')]
+    import numpy as np
+    values = np.frombuffer(raw, dtype='<f8' if column_type == 'float64' else '<i8')
+    if len(values) != rows:
+        raise ValueError("Corrupt columnar snapshot segment")
+    return values
+
+def _encode_columnar(records, row_group_size):
+    records = list(records)
+    if not all(isinstance(record, dict) for record in records):
+        raise ValueError("Columnar snapshots need a list of dictionaries")
+
+    paths = {}
+    rows = []
+    for record in records:
+        flat = dict(_flatten(record))
+        for path in flat:
+            paths.setdefault(path, len(paths))
+        rows.append(flat)
+
+    columns = []
+    for path in paths:
+        values = [row.get(path, MISSING) for row in rows]
+        columns.append({'name': '.'.join(path), 'path': list(path), 'type': _column_type(values)})
+
+    row_groups = []
+    data = []
+    offset = 0
+    for group_start in range(0, len(rows), row_group_size):
+        group_rows = rows[group_start:group_start + row_group_size]
+        segments = []
+        for path, column in zip(paths, columns):
+            segment = _encode_column(column['type'], [row.get(path, MISSING) for row in group_rows])
+            segments.append([offset, len(segment)])
+            data.append(segment)
+            offset += len(segment)
+        row_groups.append({'rows': len(group_rows), 'segments': segments})
+
+    header = json.dumps({
+        'version': 1,
+        'rows': len(rows),
+        'columns': columns,
+        'row_groups': row_groups,
+    }, separators=(',', ':')).encode('utf-8')
+    return b''.join([COLUMNAR_MAGIC, _HEADER_LENGTH.pack(len(header)), header] + data)
@@ -0,0 +1,305 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   storage_backends.py
+#       Storage backends behind DataStorage. GCS buckets are used
+#       as they are, LocalBucket keeps objects in a directory under
+#       LOCAL_STORAGE_ROOT for "local:<name>" and "file:///path"
+#       bucket settings
+# ╚═══════════════════════════════════════════════════════════╝
+
+from datetime import datetime, timezone
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'local_storage'
+)
+
+LOCAL_PREFIX = 'local:'
+FILE_PREFIX = 'file://'
+
+# Folders inside a local bucket holding sidecar metadata and in-progress writes
+_META_DIR = '.meta'
+_TMP_DIR = '.tmp'
+
+def is_local_bucket(bucket_name):
+    """Return True if a bucket setting selects the local filesystem backend"""
+    return bool(bucket_name) and bucket_name.startswith((LOCAL_PREFIX, FILE_PREFIX))
+
+def local_storage_root():
+    """Directory every local bucket must live in, from LOCAL_STORAGE_ROOT"""
+    return os.path.realpath(os.environ.get('LOCAL_STORAGE_ROOT', DEFAULT_LOCAL_ROOT))
+
+def local_bucket_path(bucket_name):
+    """
+    Resolve a local bucket setting to a directory
+
+    "local:<name>" is a folder directly under LOCAL_STORAGE_ROOT
+    (instance/local_storage by default). "file:///some/path" names the
+    directory directly, but it must also be inside LOCAL_STORAGE_ROOT once
+    symlinks are resolved, so a bucket setting can never expose other files
+    on the host.
+
+    Args:
+        bucket_name: Bucket setting
+
+    Returns:
+        Absolute directory path
+
+    Raises:
+        ValueError: If the setting is malformed or points outside LOCAL_STORAGE_ROOT
+    """
+    root = local_storage_root()
+    if bucket_name.startswith(FILE_PREFIX):
+        path = bucket_name[len(FILE_PREFIX):]
+        if not os.path.isabs(path):
+            raise ValueError(f"file:// bucket needs an absolute path: {bucket_name}")
+        path = os.path.realpath(path)
+        if path == root or os.path.commonpath([root, path]) != root:
+            raise ValueError(f"file:// buckets must be inside {root}: {bucket_name}")
+        return path
+
+    name = bucket_name[len(LOCAL_PREFIX):].strip('/')
+    if not name or name.startswith('.') or '/' in name or '\\' in name:
+        raise ValueError(f"Invalid local bucket name: {bucket_name}")
+    return os.path.join(root, name)
+
+class LocalBlob:
+    """One object of a LocalBucket, mirrors google.cloud.storage.Blob"""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+        self.content_type = None
+        self.content_encoding = None
+        self.generation = None
+        self.size = None
+        self.updated = None
+        self._path, self._meta_path = bucket._paths(name)
+
+    @property
+    def etag(self):
+        return str(self.generation) if self.generation is not None else None
+
+    def _load(self, stat):
+        """Fill the properties from a stat of the data file and the sidecar"""
+        self.generation = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.updated = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (FileNotFoundError, ValueError):
+            sidecar = {}
+        self.metadata = sidecar.get('metadata')
+        self.content_type = sidecar.get('content_type')
+        self.content_encoding = sidecar.get('content_encoding')
+
+    def reload(self):
+        """Refresh the properties from disk"""
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            from google.api_core.exceptions import NotFound
+            raise NotFound(f"{self.name} not found in {self.bucket.name}")
+        self._load(stat)
+
+    def upload_from_string(self, data, content_type='text/plain', if_generation_match=None):
+        """
+        Write the object atomically
+
+        The content is written to a temporary file, fsynced and renamed into
+        place, so readers see either the old or the new object, never a
+        partial one. The sidecar is renamed into place first, so new content
+        never appears next to the previous metadata.
+
+        Args:
+            data: String or bytes to store
+            content_type: Content type recorded in the sidecar
+            if_generation_match: Optional precondition, 0 only creates a new object
+
+        Raises:
+            PreconditionFailed: If the precondition does not hold
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        # Folders are only created on the first write, opening a bucket to read it creates nothing
+        tmp_dir = os.path.join(self.bucket.path, _TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        os.makedirs(os.path.dirname(self._meta_path), exist_ok=True)
+
+        with self.bucket._write_lock:
+            try:
+                current = os.stat(self._path).st_mtime_ns
+            except FileNotFoundError:
+                current = None
+            if if_generation_match is not None and (current or 0) != if_generation_match:
+                from google.api_core.exceptions import PreconditionFailed
+                raise PreconditionFailed(f"Generation precondition failed for {self.name}")
+
+            sidecar = {'metadata': self.metadata, 'content_type': content_type,
+                       'content_encoding': self.content_encoding}
+            meta_tmp = _write_temp(tmp_dir, json.dumps(sidecar).encode('utf-8'))
+            data_tmp = _write_temp(tmp_dir, data)
+            try:
+                # Generations must grow even on filesystems with coarse timestamps
+                generation = max(time.time_ns(), (current or 0) + 1)
+                os.utime(data_tmp, ns=(generation, generation))
+                os.replace(meta_tmp, self._meta_path)
+                os.replace(data_tmp, self._path)
+            except BaseException:
+                for path in (meta_tmp, data_tmp):
+                    if os.path.exists(path):
+                        os.unlink(path)
+                raise
+            self._load(os.stat(self._path))
+
+    def download_as_bytes(self, start=None, end=None, raw_download=False, if_generation_match=None):
+        """
+        Read the object, or a byte range of it, through a memory map
+
+        Args:
+            start: First byte to return
+            end: Last byte to return (inclusive)
+            raw_download: Accepted for API compatibility, bytes are always returned as stored
+            if_generation_match: Optional generation the object must still have
+
+        Returns:
+            The bytes
+        """
+        try:
+            f = open(self._path, 'rb')
+        except FileNotFoundError:
+            from google.api_core.exceptions import NotFound
+            raise NotFound(f"{self.name} not found in {self.bucket.name}")
+        with f:
+            stat = os.fstat(f.fileno())
+            if if_generation_match is not None and stat.st_mtime_ns != if_generation_match:
+                from google.api_core.exceptions import PreconditionFailed
+                raise PreconditionFailed(f"{self.name} changed while it was being read")
+            if stat.st_size == 0:
+                return b''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[start or 0:end + 1 if end is not None else None]
+
+    def delete(self):
+        """Remove the object and its sidecar"""
+        with self.bucket._write_lock:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                from google.api_core.exceptions import NotFound
+                raise NotFound(f"{self.name} not found in {self.bucket.name}")
+            try:
+                os.unlink(self._meta_path)
+            except FileNotFoundError:
+                pass
+
+class LocalBucket:
+    """
+    A directory used as a bucket.
+
+    Backends implement the part of the google.cloud.storage Bucket/Blob API
+    that DataStorage relies on: blob(), get_blob() and list_blobs() on the
+    bucket; upload_from_string(), download_as_bytes(), reload() and delete()
+    on blobs, plus their name, size, generation, metadata, content_type,
+    content_encoding, etag and updated properties. Errors are raised as the
+    same google.api_core exceptions GCS raises, imported only when raised.
+    """
+
+    def __init__(self, name, path):
+        """
+        Args:
+            name: Bucket setting this bucket was opened with
+            path: Directory holding the objects
+        """
+        self.name = name
+        self.path = path
+        self._write_lock = threading.Lock()
+
+    def _paths(self, blob_name):
+        """Data and sidecar paths of an object, refusing names that escape the bucket"""
+        parts = blob_name.replace('\\', '/').split('/')
+        if not blob_name or any(part in ('', '.', '..') for part in parts) or parts[0] in (_META_DIR, _TMP_DIR):
+            raise ValueError(f"Invalid object name: {blob_name}")
+        return (os.path.join(self.path, *parts),
+                os.path.join(self.path, _META_DIR, *parts[:-1], parts[-1] + '.json'))
+
+    def blob(self, blob_name):
+        return LocalBlob(self, blob_name)
+
+    def get_blob(self, blob_name):
+        """Return the object with its properties loaded, or None if it does not exist"""
+        blob = LocalBlob(self, blob_name)
+        try:
+            stat = os.stat(blob._path)
+        except FileNotFoundError:
+            return None
+        blob._load(stat)
+        return blob
+
+    def list_blobs(self, prefix=None, max_results=None, fields=None):
+        """
+        List objects in name order
+
+        Args:
+            prefix: Optional name prefix filter
+            max_results: Optional maximum number of objects
+            fields: Accepted for API compatibility, all properties are always loaded
+
+        Returns:
+            List of LocalBlob
+        """
+        names = []
+        for directory, subdirs, files in os.walk(self.path):
+            if directory == self.path:
+                subdirs[:] = [d for d in subdirs if d not in (_META_DIR, _TMP_DIR)]
+            relative = os.path.relpath(directory, self.path)
+            for filename in files:
+                name = filename if relative == '.' else f"{relative.replace(os.sep, '/')}/{filename}"
+                if not prefix or name.startswith(prefix):
+                    names.append(name)
+
+        blobs = []
+        for name in sorted(names):
+            blob = self.get_blob(name)
+            if blob is not None:
+                blobs.append(blob)
+                if max_results and len(blobs) >= max_results:
+                    break
+        return blobs
+
+def _write_temp(directory, data):
+    """Write bytes to a new fsynced temporary file and return its path"""
+    fd, path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+def open_local_bucket(bucket_name):
+    """
+    Open the local bucket a "local:" or "file://" setting points to
+
+    Args:
+        bucket_name: Bucket setting
+
+    Returns:
+        A LocalBucket
+    """
+    bucket = LocalBucket(bucket_name, local_bucket_path(bucket_name))
+    logger.info(f"Using local storage at {bucket.path} for {bucket_name}")
+    return bucket
@@ -0,0 +1,474 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   tag_index.py
+#       Persistent tag frequency index over every stored
+#       privacy_videos_* snapshot. Snapshots are merged in one
+#       at a time and counts are kept per snapshot, per day and
+#       in total so /tag_analysis never recounts old data
+# ╚═══════════════════════════════════════════════════════════╝
+
+from src.utils.sketch import SpaceSaving
+from collections import Counter
+from datetime import date, datetime, timedelta
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'tag_index.db'
+)
+
+SNAPSHOT_PREFIX = 'privacy_videos_'
+
+# Seconds before the index is synced with the bucket again
+REFRESH_SECONDS = int(os.environ.get('TAG_INDEX_REFRESH_SECONDS', 300))
+
+# Windows offered on /tag_analysis, besides YYYY-MM months
+WINDOWS = ('all', '7d', '30d', '90d', '365d')
+
+_DAYS_RE = re.compile(r'^(\d+)d$')
+_MONTH_RE = re.compile(r'^(\d{4})-(\d{2})$')
+
+# Buckets whose index is currently being synced in the background
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def normalize_tags(tags):
+    """Lower-case and strip tags, dropping empty ones"""
+    return [tag.lower().strip() for tag in tags if tag and tag.strip()]
+
+def window_days(window, today=None):
+    """
+    Turn a window name into an inclusive day range
+
+    Args:
+        window: 'all', a number of days such as '30d', or a month 'YYYY-MM'
+        today: Optional date the day windows end on
+
+    Returns:
+        Tuple of ISO (first day, last day), or None for 'all'
+
+    Raises:
+        ValueError: If the window is not recognized
+    """
+    if window in (None, '', 'all'):
+        return None
+    today = today or date.today()
+    match = _DAYS_RE.match(window)
+    if match and int(match.group(1)) > 0:
+        return (today - timedelta(days=int(match.group(1)) - 1)).isoformat(), today.isoformat()
+    match = _MONTH_RE.match(window)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return f"{window}-01", f"{window}-31"
+    raise ValueError(f"Unknown window: {window}")
+
+class TagIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        """
+        Open (or create) the SQLite index
+
+        Args:
+            path: Location of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS tag_snapshots (
+                bucket TEXT NOT NULL,
+                name TEXT NOT NULL,
+                generation INTEGER,
+                day TEXT NOT NULL,
+                videos INTEGER NOT NULL,
+                PRIMARY KEY (bucket, name)
+            );
+            CREATE TABLE IF NOT EXISTS snapshot_tags (
+                bucket TEXT NOT NULL,
+                name TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (bucket, name, tag)
+            );
+            CREATE TABLE IF NOT EXISTS daily_tags (
+                bucket TEXT NOT NULL,
+                day TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (bucket, day, tag)
+            );
+            CREATE TABLE IF NOT EXISTS total_tags (
+                bucket TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (bucket, tag)
+            );
+            CREATE TABLE IF NOT EXISTS tag_refreshes (
+                bucket TEXT PRIMARY KEY,
+                refreshed_at REAL NOT NULL
+            );
+        ''')
+        self._conn.commit()
+
+    def add_snapshot(self, bucket_name, name, generation, timestamp, tag_lists):
+        """
+        Merge one snapshot into the index, replacing an earlier version of it
+
+        Args:
+            bucket_name: Bucket holding the snapshot
+            name: Blob name of the snapshot
+            generation: Blob generation, None if unknown
+            timestamp: ISO time the snapshot was taken, decides its day
+            tag_lists: Iterable with the tags of each video (None for videos without tags)
+
+        Returns:
+            Number of videos with tags in the snapshot
+        """
+        counts = Counter()
+        videos = 0
+        for tags in tag_lists:
+            if tags:
+                videos += 1
+                counts.update(normalize_tags(tags))
+        day = (timestamp or datetime.now().isoformat())[:10]
+
+        with self._lock:
+            self._remove_snapshot(bucket_name, name)
+            self._conn.execute(
+                'INSERT INTO tag_snapshots (bucket, name, generation, day, videos) VALUES (?, ?, ?, ?, ?)',
+                (bucket_name, name, generation, day, videos)
+            )
+            self._conn.executemany(
+                'INSERT INTO snapshot_tags (bucket, name, tag, count) VALUES (?, ?, ?, ?)',
+                [(bucket_name, name, tag, count) for tag, count in counts.items()]
+            )
+            self._conn.executemany(
+                'INSERT INTO daily_tags (bucket, day, tag, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (bucket, day, tag) DO UPDATE SET count = count + excluded.count',
+                [(bucket_name, day, tag, count) for tag, count in counts.items()]
+            )
+            self._conn.executemany(
+                'INSERT INTO total_tags (bucket, tag, count) VALUES (?, ?, ?) '
+                'ON CONFLICT (bucket, tag) DO UPDATE SET count = count + excluded.count',
+                [(bucket_name, tag, count) for tag, count in counts.items()]
+            )
+            self._conn.commit()
+        logger.debug(f"Indexed {len(counts)} tags from {videos} videos in {name}")
+        return videos
+
+    def remove_snapshot(self, bucket_name, name):
+        """Take a snapshot's counts back out of the index"""
+        with self._lock:
+            self._remove_snapshot(bucket_name, name)
+            self._conn.commit()
+
+    def _remove_snapshot(self, bucket_name, name):
+        row = self._conn.execute('SELECT day FROM tag_snapshots WHERE bucket = ? AND name = ?',
+                                 (bucket_name, name)).fetchone()
+        if row is None:
+            return
+        counts = self._conn.execute('SELECT tag, count FROM snapshot_tags WHERE bucket = ? AND name = ?',
+                                    (bucket_name, name)).fetchall()
+        self._conn.executemany('UPDATE daily_tags SET count = count - ? WHERE bucket = ? AND day = ? AND tag = ?',
+                               [(count, bucket_name, row[0], tag) for tag, count in counts])
+        self._conn.executemany('UPDATE total_tags SET count = count - ? WHERE bucket = ? AND tag = ?',
+                               [(count, bucket_name, tag) for tag, count in counts])
+        self._conn.execute('DELETE FROM daily_tags WHERE bucket = ? AND day = ? AND count <= 0', (bucket_name, row[0]))
+        self._conn.execute('DELETE FROM total_tags WHERE bucket = ? AND count <= 0', (bucket_name,))
+        self._conn.execute('DELETE FROM snapshot_tags WHERE bucket = ? AND name = ?', (bucket_name, name))
+        self._conn.execute('DELETE FROM tag_snapshots WHERE bucket = ? AND name = ?', (bucket_name, name))
+
+    def sync(self, bucket_name, snapshots, load_tags):
+        """
+        Bring the index in line with the snapshots stored in a bucket
+
+        Only snapshots that are new or whose generation changed are read,
+        and snapshots that disappeared are taken back out.
+
+        Args:
+            bucket_name: Bucket that was listed
+            snapshots: Iterable of (name, generation, ISO timestamp) tuples
+            load_tags: Function returning the per-video tag lists of a snapshot name
+
+        Returns:
+            Number of snapshots merged in
+        """
+        with self._lock:
+            known = dict(self._conn.execute(
+                'SELECT name, generation FROM tag_snapshots WHERE bucket = ?', (bucket_name,)
+            ).fetchall())
+
+        merged = 0
+        seen = set()
+        for name, generation, timestamp in snapshots:
+            seen.add(name)
+            if name in known:
+                if known[name] == generation:
+                    continue
+                if known[name] is None or generation is None:
+                    # Indexed straight after our own write, before its generation was known
+                    with self._lock:
+                        self._conn.execute('UPDATE tag_snapshots SET generation = ? WHERE bucket = ? AND name = ?',
+                                           (generation, bucket_name, name))
+                        self._conn.commit()
+                    continue
+            try:
+                self.add_snapshot(bucket_name, name, generation, timestamp, load_tags(name))
+                merged += 1
+            except Exception as e:
+                logger.error(f"Error indexing tags of {name}: {str(e)}")
+
+        with self._lock:
+            for name in known:
+                if name not in seen:
+                    self._remove_snapshot(bucket_name, name)
+            self._conn.execute('INSERT OR REPLACE INTO tag_refreshes (bucket, refreshed_at) VALUES (?, ?)',
+                               (bucket_name, time.time()))
+            self._conn.commit()
+        if merged:
+            logger.info(f"Tag index for {bucket_name}: merged {merged} snapshots")
+        return merged
+
+    def refreshed_at(self, bucket_name):
+        """Return when the bucket was last synced, or None if never"""
+        with self._lock:
+            row = self._conn.execute('SELECT refreshed_at FROM tag_refreshes WHERE bucket = ?',
+                                     (bucket_name,)).fetchone()
+        return row[0] if row else None
+
+    def top_tags(self, bucket_name, k=20, window='all'):
+        """
+        Most frequent tags of a bucket's snapshots
+
+        Args:
+            bucket_name: Bucket to query
+            k: Number of tags to return
+            window: 'all', a number of days such as '30d', or a month 'YYYY-MM'
+
+        Returns:
+            Tuple of (list of (tag, count) pairs, videos with tags, snapshots) for the window
+        """
+        days = window_days(window)
+        with self._lock:
+            if days is None:
+                rows = self._conn.execute('SELECT tag, count FROM total_tags WHERE bucket = ?', (bucket_name,))
+                where, params = 'bucket = ?', (bucket_name,)
+            else:
+                rows = self._conn.execute(
+                    'SELECT tag, SUM(count) FROM daily_tags WHERE bucket = ? AND day BETWEEN ? AND ? GROUP BY tag',
+                    (bucket_name,) + days
+                )
+                where, params = 'bucket = ? AND day BETWEEN ? AND ?', (bucket_name,) + days
+            # Keep a k-sized heap over the rows instead of sorting every tag
+            top = heapq.nlargest(k, rows, key=lambda row: row[1])
+            totals = self._conn.execute(
+                f'SELECT COALESCE(SUM(videos), 0), COUNT(*) FROM tag_snapshots WHERE {where}', params
+            ).fetchone()
+        return [(tag, count) for tag, count in top], totals[0], totals[1]
+
+    def months(self, bucket_name):
+        """Months (YYYY-MM) that have indexed snapshots, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT substr(day, 1, 7) FROM tag_snapshots WHERE bucket = ? ORDER BY 1 DESC',
+                (bucket_name,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_tag_index():
+    """
+    Return the process-wide tag index
+
+    Returns:
+        A TagIndex, or None if it could not be opened
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = TagIndex(os.environ.get('TAG_INDEX_PATH', DEFAULT_INDEX_PATH))
+                except Exception as e:
+                    logger.error(f"Error opening tag index: {str(e)}")
+                    return None
+    return _index
+
+def _list_snapshots(data_storage):
+    """(name, generation, timestamp) of every privacy_videos_* snapshot, from the blob index"""
+    snapshots = []
+    page = 1
+    while True:
+        rows, total = data_storage.query_blobs(prefix=SNAPSHOT_PREFIX, page=page, per_page=1000)
+        snapshots.extend((row['name'], row['generation'], row['timestamp']) for row in rows)
+        if not rows or len(snapshots) >= total:
+            break
+        page += 1
+    return snapshots
+
+def _snapshot_tags(data_storage, name):
+    """Per-video tag lists of a snapshot, only the tags column is read"""
+    return (record.get('tags') for record in data_storage.iter_records(name, columns=['tags']))
+
+def sync_tag_index(data_storage, index):
+    """
+    Merge every new or changed snapshot of a DataStorage bucket into the index
+
+    Args:
+        data_storage: DataStorage of the bucket
+        index: TagIndex to update
+
+    Returns:
+        Number of snapshots merged in
+    """
+    return index.sync(data_storage.bucket_name, _list_snapshots(data_storage),
+                      lambda name: _snapshot_tags(data_storage, name))
+
+def _refresh(key, refreshed_at, sync):
+    """Run sync inline when never done, or on a background thread once stale"""
+    if refreshed_at is None:
+        sync()
+        return
+    if time.time() - refreshed_at <= REFRESH_SECONDS:
+        return
+
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            sync()
+        except Exception as e:
+            logger.error(f"Error refreshing {key[0]} for {key[1]}: {str(e)}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def refresh_tag_index(data_storage, index):
+    """
+    Sync the index before its first use, and in the background once it is stale
+
+    Args:
+        data_storage: DataStorage of the bucket
+        index: TagIndex to update
+    """
+    _refresh(('tag index', data_storage.bucket_name), index.refreshed_at(data_storage.bucket_name),
+             lambda: sync_tag_index(data_storage, index))
+
+# Approximate mode keeps one Space-Saving sketch per month in the bucket
+# itself, so every worker reads and extends the same bounded-size summaries
+SKETCH_PREFIX = 'sketches/tags/'
+SKETCH_EPSILON = float(os.environ.get('TAG_SKETCH_EPSILON', 0.001))
+
+# When each bucket's sketches were last synced by this process
+_sketches_synced = {}
+
+def _new_sketch_state(month):
+    return {'month': month, 'snapshots': [], 'videos': 0,
+            'sketch': SpaceSaving.from_error(SKETCH_EPSILON).to_dict()}
+
+def sync_tag_sketches(data_storage, attempts=3):
+    """
+    Fold snapshots that are not in their month's sketch yet into it
+
+    Each snapshot is summarized in its own sketch, which is merged into the
+    month's sketch. Months are updated with a generation precondition and
+    retried on conflict, so concurrent workers never lose each other's
+    merges. Sketches only ever grow: deleted snapshots stay counted.
+
+    Args:
+        data_storage: DataStorage of the bucket
+        attempts: Tries per month when another writer got there first
+
+    Returns:
+        Number of snapshots merged in
+    """
+    by_month = {}
+    for name, _, timestamp in _list_snapshots(data_storage):
+        by_month.setdefault((timestamp or datetime.now().isoformat())[:7], []).append(name)
+    existing = set(data_storage.list_blobs(prefix=SKETCH_PREFIX))
+
+    merged = 0
+    for month, names in by_month.items():
+        blob_name = f"{SKETCH_PREFIX}{month}.json"
+        if blob_name not in existing:
+            # Create-only write, harmless if another worker created it first
+            data_storage.save_sketch_data(blob_name, _new_sketch_state(month), if_generation_match=0)
+
+        for _ in range(attempts):
+            generation = data_storage.get_blob(blob_name).generation
+            state = data_storage.load_data(blob_name)
+            done = set(state['snapshots'])
+            new = [name for name in names if name not in done]
+            if not new:
+                break
+
+            sketch = SpaceSaving.from_dict(state['sketch'])
+            videos = state['videos']
+            for name in new:
+                part = SpaceSaving(sketch.capacity)
+                for tags in _snapshot_tags(data_storage, name):
+                    if tags:
+                        videos += 1
+                        part.update_many(normalize_tags(tags))
+                sketch = sketch.merge(part)
+
+            state = {'month': month, 'snapshots': sorted(done | set(new)), 'videos': videos,
+                     'sketch': sketch.to_dict()}
+            if data_storage.save_sketch_data(blob_name, state, if_generation_match=generation):
+                merged += len(new)
+                break
+            logger.info(f"Sketch {blob_name} changed while merging, retrying")
+    if merged:
+        logger.info(f"Tag sketches for {data_storage.bucket_name}: merged {merged} snapshots")
+    _sketches_synced[data_storage.bucket_name] = time.time()
+    return merged
+
+def approx_top_tags(data_storage, k=20, window='all'):
+    """
+    Approximate top tags from the stored monthly sketches
+
+    Day windows are widened to the whole months they touch.
+
+    Args:
+        data_storage: DataStorage of the bucket
+        k: Number of tags to return
+        window: 'all', a number of days such as '30d', or a month 'YYYY-MM'
+
+    Returns:
+        Tuple of (list of (tag, estimated count) pairs, videos with tags,
+        snapshots, largest overestimation of a count)
+    """
+    _refresh(('tag sketches', data_storage.bucket_name), _sketches_synced.get(data_storage.bucket_name),
+             lambda: sync_tag_sketches(data_storage))
+
+    days = window_days(window)
+    merged = SpaceSaving.from_error(SKETCH_EPSILON)
+    videos = snapshots = 0
+    for blob_name in data_storage.list_blobs(prefix=SKETCH_PREFIX):
+        month = blob_name[len(SKETCH_PREFIX):].split('.')[0]
+        if days is not None and not days[0][:7] <= month <= days[1][:7]:
+            continue
+        state = data_storage.load_data(blob_name)
+        merged = merged.merge(SpaceSaving.from_dict(state['sketch']))
+        videos += state['videos']
+        snapshots += len(state['snapshots'])
+    return merged.top(k), videos, snapshots, merged.error_bound()
+
+def sketch_months(data_storage):
+    """Months (YYYY-MM) that have a stored tag sketch, newest first"""
+    names = data_storage.list_blobs(prefix=SKETCH_PREFIX)
+    return sorted((name[len(SKETCH_PREFIX):].split('.')[0] for name in names), reverse=True)
@@ -0,0 +1,119 @@
+# src/utils/cache.py
+from collections import OrderedDict
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """
+    Thread safe in-process cache with a time to live, LRU eviction and
+    stale-while-revalidate reads.
+
+    Entries younger than ttl are served as is. Entries between ttl and
+    ttl + stale_ttl are still served, but a background refresh is started
+    so the next reader gets fresh data. Older entries are reloaded inline.
+    """
+
+    def __init__(self, ttl=300, stale_ttl=0, max_size=128, name='cache'):
+        """
+        Args:
+            ttl: Seconds an entry is considered fresh
+            stale_ttl: Extra seconds a stale entry may be served while it refreshes
+            max_size: Maximum number of entries before the least recently used is evicted
+            name: Name used in log messages
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refreshing = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return a fresh or stale value for key without loading it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl + self.stale_ttl:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value and evict the least recently used entries if needed"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_or_load(self, key, loader, should_cache=None):
+        """
+        Return the cached value for key, calling loader to fill it when needed
+
+        Args:
+            key: Hashable cache key
+            loader: Function with no arguments that produces the value
+            should_cache: Optional predicate, values it rejects (e.g. errors) are returned but not stored
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = time.monotonic() - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh,
+                                         args=(key, loader, should_cache),
+                                         daemon=True).start()
+                    return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a missing key, the others wait for its result
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                    return entry[0]
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+            return value
+
+    def _refresh(self, key, loader, should_cache):
+        """Reload a stale entry in the background"""
+        try:
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+        except Exception as e:
+            logger.error(f"Error refreshing {self.name} entry: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
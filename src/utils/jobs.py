@@ -0,0 +1,154 @@
+# src/utils/jobs.py
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """State of one background job, safe to read from any thread"""
+
+    def __init__(self, key, description):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.description = description
+        self.status = 'queued'
+        self.progress = 0
+        self.message = 'Waiting for a worker'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return self.status in ('queued', 'running')
+
+    def update(self, progress=None, message=None):
+        """Report progress from inside the job function"""
+        with self._lock:
+            if progress is not None:
+                self.progress = max(0, min(int(progress), 100))
+            if message is not None:
+                self.message = message
+
+    def to_dict(self):
+        """JSON friendly view of the job for the status endpoint"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'description': self.description,
+                'status': self.status,
+                'progress': self.progress,
+                'message': self.message,
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at
+            }
+
+class JobQueue:
+    """
+    Runs slow work (YouTube fetches, storage uploads) on a worker pool
+    instead of inside the request.
+
+    Jobs are identified by a random id for status polling and by a key
+    describing the work. Submitting a key that is already queued or running
+    returns the existing job instead of starting a duplicate. Job state
+    lives in this process, so status polls must reach the process that
+    accepted the job.
+    """
+
+    def __init__(self, max_workers=2, retention=3600):
+        """
+        Args:
+            max_workers: Jobs run at the same time
+            retention: Seconds finished jobs stay available to the status endpoint
+        """
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, description, fn, *args, **kwargs):
+        """
+        Queue a job unless an identical one is already in flight
+
+        Args:
+            key: Hashable description of the work, used for deduplication
+            description: Short text shown with the job status
+            fn: Function called as fn(job, *args, **kwargs), its return value becomes the job result
+
+        Returns:
+            Tuple of (Job, True if a new job was queued)
+        """
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None and job.in_flight:
+                logger.info(f"Job {job.id} already running for {description}")
+                return job, False
+
+            job = Job(key, description)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"Queued job {job.id}: {description}")
+        return job, True
+
+    def get(self, job_id):
+        """Return a job by id, or None if it is unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        with job._lock:
+            job.status = 'running'
+            job.message = 'Running'
+        try:
+            result = fn(job, *args, **kwargs)
+            with job._lock:
+                job.result = result
+                job.progress = 100
+                job.message = 'Done'
+                job.status = 'done'
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.description}) failed: {str(e)}", exc_info=True)
+            with job._lock:
+                job.error = str(e)
+                job.message = 'Failed'
+                job.status = 'failed'
+        finally:
+            with job._lock:
+                job.finished_at = time.time()
+            with self._lock:
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process-wide job queue, sized by JOB_WORKERS"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(
+                    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+                    retention=int(os.environ.get('JOB_RETENTION_SECONDS', 3600))
+                )
+    return _queue
@@ -0,0 +1,197 @@
+# src/utils/metrics.py
+from bisect import bisect_left
+from contextlib import ContextDecorator
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0)
+
+    def render(self, extra=()):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key, extra)} {_format_number(value)}"
+                for key, value in values]
+
+class Histogram:
+    """
+    Cumulative histogram with a fixed set of label names.
+
+    Each labelled series keeps one count per bucket plus the sum and count,
+    so observe() is a bisect and a few additions under a lock.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Bucket counts, then sum and count
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, '') for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def time(self, **labels):
+        """Context manager and decorator observing the elapsed time, with an 'outcome' label if declared"""
+        return _Timer(self, labels)
+
+    def render(self, extra=()):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = 'le="' + _format_number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, (*extra, le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key, extra)} {_format_number(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key, extra)} {values[-1]}")
+        return lines
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self._local = threading.local()
+
+    def __enter__(self):
+        # A stack, so one decorated function can be re-entered or run on several threads
+        stack = getattr(self._local, 'started', None)
+        if stack is None:
+            stack = self._local.started = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._local.started.pop()
+        labels = self.labels
+        if 'outcome' in self.histogram.labelnames and 'outcome' not in labels:
+            labels = {**labels, 'outcome': 'error' if exc_type is not None else 'ok'}
+        self.histogram.observe(elapsed, **labels)
+        return False
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Return the counter called name, registering it on first use"""
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Return the histogram called name, registering it on first use"""
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Every series carries a pid label. Metrics are kept per process, so
+        with several workers each one is a separate series that restarts
+        from zero when its worker does.
+
+        Returns:
+            The exposition text, ending with a newline
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        extra = (f'pid="{os.getpid()}"',)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render(extra))
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+# Calls leaving the process: YouTube, GCS (or the local bucket), the Natural
+# Language API, plus the local sentiment backends for comparison
+EXTERNAL_CALL_SECONDS = REGISTRY.histogram(
+    'external_call_duration_seconds',
+    'Duration of calls to external services',
+    ('service', 'operation', 'outcome')
+)
+
+def timed(service, operation):
+    """
+    Time a block or function as an external call
+
+    Usable as `with timed('gcs', 'download'):` or as a decorator. The
+    outcome label is 'error' when the block raises and 'ok' otherwise.
+
+    Args:
+        service: Service called, e.g. 'youtube', 'gcs', 'language'
+        operation: Operation within the service
+
+    Returns:
+        A context manager that is also a decorator
+    """
+    return EXTERNAL_CALL_SECONDS.time(service=service, operation=operation)
+
+def observe_call(service, operation, seconds, outcome='ok'):
+    """Record an external call timed by the caller, for calls that report errors without raising"""
+    EXTERNAL_CALL_SECONDS.observe(seconds, service=service, operation=operation, outcome=outcome)
@@ -0,0 +1,146 @@
+# src/utils/sketch.py
+import heapq
+import math
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters summary (Metwally et al.)
+
+    Tracks at most `capacity` items, so memory stays fixed however many
+    distinct items are seen. Every reported count is an upper bound of the
+    true count and overestimates it by at most `errors[item]`, which never
+    exceeds total / capacity. Any item more frequent than that bound is
+    guaranteed to be tracked. Summaries with the same capacity can be
+    merged, so they can be built per worker or per snapshot and combined.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity: Number of counters kept
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # One (count, item) entry per tracked item, refreshed lazily when popped
+        self._heap = []
+
+    @classmethod
+    def from_error(cls, epsilon):
+        """Create a summary whose counts are off by at most epsilon * total"""
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon must be between 0 and 1")
+        return cls(math.ceil(1 / epsilon))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, item, weight=1):
+        """Count one occurrence (or weight occurrences) of an item, amortized O(log capacity)"""
+        self.total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+            return
+
+        # Replace the smallest counter, the newcomer inherits its count as error
+        floor, victim = self._pop_min()
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[item] = floor + weight
+        self.errors[item] = floor
+        heapq.heappush(self._heap, (floor + weight, item))
+
+    def update_many(self, items):
+        for item in items:
+            self.update(item)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counts[item]
+            if current == count:
+                return count, item
+            heapq.heappush(self._heap, (current, item))
+
+    def _floor(self):
+        """Smallest count an untracked item could have"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def estimate(self, item):
+        """Upper bound of an item's count"""
+        return self.counts.get(item, self._floor())
+
+    def error_bound(self):
+        """Largest overestimation of any reported count"""
+        return max(self.errors.values(), default=0)
+
+    def top(self, k):
+        """
+        Most frequent items
+
+        Args:
+            k: Number of items to return
+
+        Returns:
+            List of (item, estimated count) pairs, highest first
+        """
+        return heapq.nlargest(k, self.counts.items(), key=lambda entry: entry[1])
+
+    def merge(self, other):
+        """
+        Combine two summaries into a new one
+
+        Items missing from a full summary are charged its smallest counter,
+        both as count and as error, which keeps the bounds of the inputs.
+
+        Args:
+            other: SpaceSaving to merge with
+
+        Returns:
+            A new SpaceSaving with the larger of the two capacities
+        """
+        floor, other_floor = self._floor(), other._floor()
+        merged = {}
+        for item in set(self.counts) | set(other.counts):
+            merged[item] = (self.counts.get(item, floor) + other.counts.get(item, other_floor),
+                            self.errors.get(item, floor) + other.errors.get(item, other_floor))
+
+        result = SpaceSaving(max(self.capacity, other.capacity))
+        result.total = self.total + other.total
+        for item, (count, error) in heapq.nlargest(result.capacity, merged.items(), key=lambda entry: entry[1][0]):
+            result.counts[item] = count
+            result.errors[item] = error
+        result._heap = [(count, item) for item, count in result.counts.items()]
+        heapq.heapify(result._heap)
+        return result
+
+    def to_dict(self):
+        """JSON friendly form, used to store the summary in the bucket"""
+        return {
+            'type': 'space_saving',
+            'capacity': self.capacity,
+            'total': self.total,
+            'items': [[item, count, self.errors[item]] for item, count in self.counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a summary from to_dict output"""
+        if data.get('type') != 'space_saving':
+            raise ValueError(f"Not a Space-Saving summary: {data.get('type')}")
+        summary = cls(data['capacity'])
+        summary.total = data['total']
+        for item, count, error in data['items']:
+            summary.counts[item] = count
+            summary.errors[item] = error
+        summary._heap = [(count, item) for item, count in summary.counts.items()]
+        heapq.heapify(summary._heap)
+        return summary
@@ -0,0 +1,122 @@
+# src/utils/startup_report.py
+from collections import defaultdict
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run in a fresh interpreter: import the app, build it and serve one request
+_PROBE = '''
+import json, time
+started = time.perf_counter()
+from src.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': created - imported,
+    'first_request_seconds': served - created,
+    'total_seconds': served - started,
+    'status': response.status_code
+}))
+'''
+
+def parse_importtime(output):
+    """
+    Parse the stderr of python -X importtime
+
+    Args:
+        output: Text written by the interpreter
+
+    Returns:
+        List of (module, self seconds, cumulative seconds, nesting depth) in import order
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(fields[0]) / 1e6, int(fields[1]) / 1e6, depth))
+    return modules
+
+def _scratch_environment(directory):
+    """Environment for the probe with every database and cache inside directory"""
+    env = dict(os.environ)
+    env.update({
+        'USERS_DB_URI': 'sqlite:///' + os.path.join(directory, 'users.db'),
+        'SESSION_DB_PATH': os.path.join(directory, 'sessions.db'),
+        'BLOB_CACHE_DIR': os.path.join(directory, 'blob_cache'),
+        'BLOB_INDEX_PATH': os.path.join(directory, 'blob_index.db'),
+        'TAG_INDEX_PATH': os.path.join(directory, 'tag_index.db'),
+        'SENTIMENT_CACHE_PATH': os.path.join(directory, 'sentiment_cache.db'),
+        'LOCAL_STORAGE_ROOT': os.path.join(directory, 'local_storage'),
+    })
+    return env
+
+def startup_report(top=15):
+    """
+    Measure a cold start of the app in a subprocess
+
+    The probe keeps its databases in a temporary directory, so measuring
+    does not touch the instance folder.
+
+    Args:
+        top: Number of modules and packages listed
+
+    Returns:
+        Dictionary with the probe timings, the slowest modules by cumulative
+        import time and the packages with the largest own import time
+    """
+    with tempfile.TemporaryDirectory(prefix='startup-probe-') as scratch:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _PROBE],
+            cwd=ROOT, capture_output=True, text=True, env=_scratch_environment(scratch)
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed: {result.stderr.strip().splitlines()[-1:]}")
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+
+    packages = defaultdict(float)
+    for name, self_seconds, _, _ in modules:
+        packages[name.split('.')[0]] += self_seconds
+
+    timings['slowest_modules'] = [
+        {'module': name, 'cumulative_seconds': cumulative, 'depth': depth}
+        for name, _, cumulative, depth in sorted(modules, key=lambda m: m[2], reverse=True)[:top]
+    ]
+    timings['packages'] = [
+        {'package': name, 'seconds': seconds}
+        for name, seconds in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]
+    ]
+    timings['module_count'] = len(modules)
+    return timings
+
+def format_startup_report(report):
+    """Render a startup report as plain text"""
+    lines = [
+        f"Imports:        {report['import_seconds'] * 1000:8.1f} ms ({report['module_count']} modules)",
+        f"create_app():   {report['create_app_seconds'] * 1000:8.1f} ms",
+        f"First request:  {report['first_request_seconds'] * 1000:8.1f} ms (status {report['status']})",
+        f"Total:          {report['total_seconds'] * 1000:8.1f} ms",
+        '',
+        'Slowest imports (cumulative):'
+    ]
+    for entry in report['slowest_modules']:
+        lines.append(f"  {entry['cumulative_seconds'] * 1000:8.1f} ms  {'  ' * entry['depth']}{entry['module']}")
+    lines.append('')
+    lines.append('Import time by package (own time):')
+    for entry in report['packages']:
+        lines.append(f"  {entry['seconds'] * 1000:8.1f} ms  {entry['package']}")
+    return '\n'.join(lines)
@@ -4,19 +4,96 @@
 #       The youtube api for later use throughout the website
 # ╚═══════════════════════════════════════════════════════════╝
 
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 import os
 import json
 import logging
-from flask import session
+import threading
+from src.utils.cache import TTLCache
+from src.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# Timeout (seconds) for each YouTube API HTTP request
+HTTP_TIMEOUT = int(os.environ.get('YOUTUBE_HTTP_TIMEOUT', 30))
+
+def _youtube_error_message(error):
+    """Return the message of a YouTube API HttpError, or None for any other exception"""
+    # Imported here, googleapiclient is only needed once a call has failed
+    from googleapiclient.errors import HttpError
+    if not isinstance(error, HttpError):
+        return None
+    return json.loads(error.content).get('error', {}).get('message', 'Unknown error')
+
+# Process-wide pool of built API clients, keyed by API key
+_client_pool = {}
+_client_pool_lock = threading.Lock()
+
+# Search results shared by every route, so page navigation does not
+# spend YouTube quota inside the freshness window
+_search_cache = TTLCache(
+    ttl=int(os.environ.get('YOUTUBE_CACHE_TTL', 300)),
+    stale_ttl=int(os.environ.get('YOUTUBE_CACHE_STALE_TTL', 600)),
+    max_size=int(os.environ.get('YOUTUBE_CACHE_SIZE', 128)),
+    name='YouTube search cache'
+)
+
+# httplib2.Http is not thread safe, so every thread gets its own
+# connection object which keeps its connections alive between requests
+_thread_local = threading.local()
+
+def get_youtube_client(api_key):
+    """
+    Get the shared YouTube API client for an API key, building it on first use
+
+    Args:
+        api_key: YouTube Data API key
+
+    Returns:
+        A googleapiclient Resource for the YouTube Data API v3
+    """
+    client = _client_pool.get(api_key)
+    if client is not None:
+        return client
+
+    with _client_pool_lock:
+        client = _client_pool.get(api_key)
+        if client is None:
+            logger.info("Building YouTube API client")
+            # Imported here, the discovery client is slow to import
+            from googleapiclient.discovery import build
+            import httplib2
+            with timed('youtube', 'build_client'):
+                client = build('youtube', 'v3', developerKey=api_key,
+                               http=httplib2.Http(timeout=HTTP_TIMEOUT),
+                               cache_discovery=False)
+            _client_pool[api_key] = client
+    return client
+
+def _thread_http():
+    """Return the keep-alive HTTP connection object for the current thread"""
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        import httplib2
+        http = httplib2.Http(timeout=HTTP_TIMEOUT)
+        _thread_local.http = http
+    return http
+
 class YouTubeStats:
-    def __init__(self):
-        self.api_key = session.get('youtube_api_key') or os.environ.get('YOUTUBE_API_KEY', 'your-api-key-here')
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+    def __init__(self, api_key=None):
+        """
+        Set up access to the YouTube API using the shared client pool
+
+        Args:
+            api_key: YouTube Data API key, defaults to the YOUTUBE_API_KEY environment variable
+        """
+        self.api_key = api_key or os.environ.get('YOUTUBE_API_KEY', 'your-api-key-here')
+        self.youtube = get_youtube_client(self.api_key)
+
+    def _execute(self, request):
+        """Execute an API request on this thread's keep-alive connection"""
+        # methodId is e.g. 'youtube.search.list'
+        with timed('youtube', getattr(request, 'methodId', None) or 'request'):
+            return request.execute(http=_thread_http())
     
     def get_top_popular_videos(self, max_results=20, region_code='US'):
         """
@@ -30,12 +107,12 @@ class YouTubeStats:
             A list of dictionaries with video information
         """
         try:
-            videos_response = self.youtube.videos().list(
+            videos_response = self._execute(self.youtube.videos().list(
                 part='snippet,contentDetails,statistics',
                 chart='mostPopular',
                 regionCode=region_code,
                 maxResults=max_results
-            ).execute()
+            ))
             
             videos_data = []
             
@@ -52,34 +129,48 @@ class YouTubeStats:
                 
             return videos_data
             
-        except HttpError as e:
-            error_message = json.loads(e.content).get('error', {}).get('message', 'Unknown error')
-            logger.error(f"YouTube API error: {error_message}")
-            return {'error': f"YouTube API error: {error_message}"}
         except Exception as e:
+            error_message = _youtube_error_message(e)
+            if error_message is not None:
+                logger.error(f"YouTube API error: {error_message}")
+                return {'error': f"YouTube API error: {error_message}"}
             logger.error(f"An unexpected error occurred: {str(e)}")
             return {'error': f"An unexpected error occurred: {str(e)}"}
     
-    # Modified search_privacy_videos method for YouTubeStats class
-
-    def search_privacy_videos(self, max_results=20):
+    def search_privacy_videos(self, max_results=20, use_cache=True):
         """
         Search for videos related to data privacy
 
+        Results are shared through a process-wide cache, so callers must
+        treat the returned list as read-only.
+
         Args:
             max_results: Number of videos to return
+            use_cache: Set to False to always query the API
 
         Returns:
             A list of dictionaries with video information
         """
+        if not use_cache:
+            return self._search_privacy_videos(max_results)
+
+        key = (self.api_key, 'data privacy', max_results)
+        return _search_cache.get_or_load(
+            key,
+            lambda: self._search_privacy_videos(max_results),
+            should_cache=lambda result: isinstance(result, list)
+        )
+
+    def _search_privacy_videos(self, max_results):
+        """Run the search and video detail API calls behind search_privacy_videos"""
         try:
-            search_response = self.youtube.search().list(
+            search_response = self._execute(self.youtube.search().list(
                 part='snippet',
                 q='data privacy',
                 type='video',
                 order='relevance',
                 maxResults=max_results
-            ).execute()
+            ))
             
             videos_data = []
             video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
@@ -88,10 +179,10 @@ class YouTubeStats:
                 return []
             
             # Make sure to include the 'snippet' part which contains tags
-            videos_response = self.youtube.videos().list(
+            videos_response = self._execute(self.youtube.videos().list(
                 part='snippet,contentDetails,statistics',
                 id=','.join(video_ids)
-            ).execute()
+            ))
             
             for video in videos_response.get('items', []):
                 # Extract tags from the snippet if they exist
@@ -113,52 +204,94 @@ class YouTubeStats:
                 
             return videos_data
             
-        except HttpError as e:
-            error_message = json.loads(e.content).get('error', {}).get('message', 'Unknown error')
-            logger.error(f"YouTube API error: {error_message}")
-            return {'error': f"YouTube API error: {error_message}"}
         except Exception as e:
+            error_message = _youtube_error_message(e)
+            if error_message is not None:
+                logger.error(f"YouTube API error: {error_message}")
+                return {'error': f"YouTube API error: {error_message}"}
             logger.error(f"An unexpected error occurred: {str(e)}")
             return {'error': f"An unexpected error occurred: {str(e)}"}
     
+    def iter_comment_pages(self, video_id, max_comments=None, page_size=100):
+        """
+        Stream the comments of a video one API page at a time
+
+        Follows nextPageToken until max_comments have been produced or the
+        video has no more comments. Only the current page is held in memory,
+        so callers can process very large videos incrementally.
+
+        Args:
+            video_id: YouTube video ID
+            max_comments: Maximum number of comments to yield, None for all of them
+            page_size: Comments requested per API call (max 100)
+
+        Yields:
+            Lists of comment dictionaries
+
+        Raises:
+            RuntimeError: If the YouTube API returns an error
+        """
+        page_token = None
+        remaining = max_comments
+
+        while remaining is None or remaining > 0:
+            request_size = page_size if remaining is None else min(page_size, remaining)
+            try:
+                comments_response = self._execute(self.youtube.commentThreads().list(
+                    part='snippet',
+                    videoId=video_id,
+                    textFormat='plainText',
+                    maxResults=request_size,
+                    pageToken=page_token
+                ))
+            except Exception as e:
+                error_message = _youtube_error_message(e)
+                if error_message is None:
+                    raise
+                logger.error(f"YouTube API error: {error_message}")
+                raise RuntimeError(f"YouTube API error: {error_message}") from e
+
+            page = [self._parse_comment(item) for item in comments_response.get('items', [])]
+            if remaining is not None:
+                page = page[:remaining]
+                remaining -= len(page)
+            if page:
+                yield page
+
+            page_token = comments_response.get('nextPageToken')
+            if not page_token:
+                break
+
+    def _parse_comment(self, item):
+        """Convert a commentThreads API item into a comment dictionary"""
+        comment = item['snippet']['topLevelComment']['snippet']
+        return {
+            'id': item['id'],
+            'text': comment['textDisplay'],
+            'author': comment['authorDisplayName'],
+            'likes': comment['likeCount'],
+            'published_at': comment['publishedAt']
+        }
+
     def get_video_comments(self, video_id, max_results=50):
         """
         Get a limited number of comments for a specific video
 
         Args:
             video_id: YouTube video ID
-            max_results: Maximum number of comments to retrieve (default: 50)
+            max_results: Maximum number of comments to retrieve (default: 50), None for all
 
         Returns:
             A list of comment dictionaries
         """
         try:
-            comments_response = self.youtube.commentThreads().list(
-                part='snippet',
-                videoId=video_id,
-                textFormat='plainText',
-                maxResults=max_results
-            ).execute()
-            
             comments_data = []
-            
-            for item in comments_response.get('items', []):
-                comment = item['snippet']['topLevelComment']['snippet']
-                comment_data = {
-                    'id': item['id'],
-                    'text': comment['textDisplay'],
-                    'author': comment['authorDisplayName'],
-                    'likes': comment['likeCount'],
-                    'published_at': comment['publishedAt']
-                }
-                comments_data.append(comment_data)
-                
+            for page in self.iter_comment_pages(video_id, max_comments=max_results):
+                comments_data.extend(page)
             return comments_data
-            
-        except HttpError as e:
-            error_message = json.loads(e.content).get('error', {}).get('message', 'Unknown error')
-            logger.error(f"YouTube API error: {error_message}")
-            return {'error': f"YouTube API error: {error_message}"}
+
+        except RuntimeError as e:
+            return {'error': str(e)}
         except Exception as e:
             logger.error(f"An unexpected error occurred: {str(e)}")
             return {'error': f"An unexpected error occurred: {str(e)}"}
\ No newline at end of file
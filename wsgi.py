@@ -0,0 +1,9 @@
+# ╔═══════════════════════════════════════════════════════════╗
+#   wsgi.py
+#       Production entry point. gunicorn imports this module once
+#       in the master (preload_app) and forks the workers from it,
+#       see gunicorn.conf.py
+# ╚═══════════════════════════════════════════════════════════╝
+from src.app import create_app
+
+app = create_app()